@@ -0,0 +1,61 @@
+"""Benchmark: per-row apply vs. vectorized categorical features in merge_data."""
+
+import argparse
+from pathlib import Path
+import timeit
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+
+from dopro2_HEFTcom_challenge.utils import (
+    categorize_wind_dir,
+    categorize_wind_dir_vectorized,
+    get_season,
+    get_season_vectorized,
+    get_time_of_day,
+    get_time_of_day_vectorized
+)
+
+
+def with_apply(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "season": df["valid_time"].dt.month.apply(get_season),
+        "time_of_day": df["valid_time"].dt.hour.apply(get_time_of_day),
+        "wind_dir_cat": df["WindDirection:100"].apply(categorize_wind_dir)
+    })
+
+
+def vectorized(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "season": get_season_vectorized(df["valid_time"].dt.month),
+        "time_of_day": get_time_of_day_vectorized(df["valid_time"].dt.hour),
+        "wind_dir_cat": categorize_wind_dir_vectorized(df["WindDirection:100"])
+    }, index=df.index)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", type=Path,
+                        default=Path("artifacts/prepared_data/merged_data.parquet"),
+                        help="merged table written by DataPreparation.merge_data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.data, columns=["valid_time", "WindDirection:100"])
+    logger.info("Loaded {} rows from {}", len(df), args.data)
+
+    expected = with_apply(df)
+    result = vectorized(df)
+    for column in expected.columns:
+        assert np.array_equal(expected[column].to_numpy(),
+                              result[column].astype(object).to_numpy()), column
+
+    t_apply = min(timeit.repeat(lambda: with_apply(df), number=1, repeat=args.repeat))
+    t_vec = min(timeit.repeat(lambda: vectorized(df), number=1, repeat=args.repeat))
+    logger.info("apply: {:.3f}s, vectorized: {:.3f}s, speed-up: {:.1f}x",
+                t_apply, t_vec, t_apply / t_vec)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: import time of the package and of the pipeline entry points."""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from loguru import logger
+
+
+MODULES = [
+    "dopro2_HEFTcom_challenge",
+    "dopro2_HEFTcom_challenge.pipeline",
+    "dopro2_HEFTcom_challenge.pipeline.stage_05_prediction"
+]
+HEAVY_MODULES = ["dagshub", "gdown", "mlflow", "sklearn", "statsmodels", "xarray"]
+
+
+def import_in_subprocess(module: str) -> tuple[float, list[str]]:
+    """Import time of a module in a fresh interpreter and the heavy modules it loads."""
+
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "seconds = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps([seconds, heavy]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                            text=True, check=True).stdout
+    seconds, heavy = json.loads(output.splitlines()[-1])
+    return seconds, heavy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.0,
+                        help="fail if the prediction stage imports slower than this")
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        runs = [import_in_subprocess(module) for _ in range(args.repeat)]
+        seconds = min(run[0] for run in runs)
+        heavy = runs[0][1]
+        logger.info("{}: {:.3f}s, heavy modules loaded: {}",
+                    module, seconds, heavy or "none")
+        if (module.endswith("stage_05_prediction")
+                and (heavy or seconds > args.max_seconds)):
+            failed = True
+
+    if failed:
+        logger.error("The prediction stage imports too slowly or loads heavy modules")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    main()
+    logger.info("Finished in {:.1f}s", time.perf_counter() - start)
@@ -0,0 +1,50 @@
+"""Benchmark: weather preparation time with one and with all configured NWP models."""
+
+import argparse
+from dataclasses import replace
+from pathlib import Path
+import tempfile
+import time
+
+from loguru import logger
+
+from dopro2_HEFTcom_challenge.components import DataPreparation
+from dopro2_HEFTcom_challenge.config import ConfigurationManager
+
+
+def prepare(config, n_sources: int, incremental: bool) -> tuple[float, list[str]]:
+    """Seconds to load and align the weather files and the columns of the result."""
+
+    data_preparation = DataPreparation(replace(
+        config, nwp_sources=config.nwp_sources[:n_sources], incremental=incremental
+    ))
+    start = time.perf_counter()
+    hornsea, solar = data_preparation.cleaning_weather_data()
+    return time.perf_counter() - start, [*hornsea.columns, *solar.columns]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", type=Path, default=Path("artifacts/raw_data/weather"),
+                        help="directory with the NetCDF files of all NWP models")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    config = ConfigurationManager().get_data_preparation_config()
+    with tempfile.TemporaryDirectory() as root_dir:
+        config = replace(config, weather_data_path=str(args.data), root_dir=root_dir,
+                         manifest_path=f"{root_dir}/manifest.json",
+                         n_workers=args.workers, checkpoints=[])
+        for n_sources in range(1, len(config.nwp_sources) + 1):
+            seconds, columns = prepare(config, n_sources, incremental=False)
+            logger.info("{} model(s): {:.2f}s, {} columns",
+                        n_sources, seconds, len(columns))
+
+        # the reduced data of all models is cached in the partitioned datasets
+        prepare(config, len(config.nwp_sources), incremental=True)
+        seconds, _ = prepare(config, len(config.nwp_sources), incremental=True)
+        logger.info("All models from the cache: {:.2f}s", seconds)
+
+
+if __name__ == "__main__":
+    main()
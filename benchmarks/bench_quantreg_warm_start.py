@@ -0,0 +1,61 @@
+"""Benchmark: cold-started vs. warm-started quantile regression fits."""
+
+import argparse
+from pathlib import Path
+import time
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import yaml
+
+from dopro2_HEFTcom_challenge.components.training import Training
+from dopro2_HEFTcom_challenge.utils import WarmStartQuantReg
+
+
+def fit_cold(model: WarmStartQuantReg, quantiles: list[int], max_iter: int) -> dict:
+    return {q: model.fit(q=q / 100, max_iter=max_iter) for q in quantiles}
+
+
+def fit_warm(model: WarmStartQuantReg, quantiles: list[int], max_iter: int) -> dict:
+    fitted = {}
+    for q, seed in Training.warm_start_order(quantiles):
+        start_params = None if seed is None else fitted[seed].params.to_numpy()
+        fitted[q] = model.fit(q=q / 100, max_iter=max_iter, start_params=start_params)
+    return fitted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", type=Path,
+                        default=Path("artifacts/prepared_data/model_data.parquet"),
+                        help="model table written by DataPreparation")
+    parser.add_argument("--params", type=Path, default=Path("params.yaml"))
+    args = parser.parse_args()
+
+    with args.params.open("r", encoding="utf-8") as f:
+        params = yaml.safe_load(f)["quantile_regression"]
+
+    df = pd.read_parquet(args.data, columns=params["columns"])
+    model = WarmStartQuantReg.from_formula(params["formula"], df)
+    logger.info("Loaded {} rows from {}", len(df), args.data)
+
+    results = {}
+    for name, fit in (("cold", fit_cold), ("warm", fit_warm)):
+        start = time.perf_counter()
+        fitted = fit(model, params["quantiles"], params["max_iter"])
+        seconds = time.perf_counter() - start
+        results[name] = fitted
+        logger.info("{}: {:.2f}s, {} iterations, {} of {} converged",
+                    name, seconds, sum(r.iterations for r in fitted.values()),
+                    sum(bool(r.converged) for r in fitted.values()), len(fitted))
+
+    for q in params["quantiles"]:
+        cold, warm = results["cold"][q], results["warm"][q]
+        logger.info("q{}: iterations {} -> {}, max |param diff| {:.2e}",
+                    q, cold.iterations, warm.iterations,
+                    np.max(np.abs(cold.params - warm.params)))
+
+
+if __name__ == "__main__":
+    main()
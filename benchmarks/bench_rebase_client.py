@@ -0,0 +1,110 @@
+"""
+Benchmark: sequential vs. concurrent weather queries against a local stub of
+the Rebase API.
+"""
+
+import argparse
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+from loguru import logger
+import pandas as pd
+
+from dopro2_HEFTcom_challenge.entity import RebaseAPI
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer weather queries after a delay, the first requests fail with 503."""
+
+    delay = 0.2
+    failures = 0
+    lock = threading.Lock()
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.lock:
+            fail = StubHandler.failures > 0
+            StubHandler.failures -= fail
+        if fail:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        time.sleep(self.delay)
+        variables = [v.strip() for v in body["variables"].split(",")]
+        times = {"ref_datetime": "2024-05-20T00:00:00Z",
+                 "valid_datetime": list(range(48))}
+        if body["type"] == "grid":
+            data = [{**times, "latitude": lat, "longitude": lon,
+                     **{v: [1.0] * 48 for v in variables}}
+                    for lat in body["latitude"] for lon in body["longitude"]]
+        else:
+            data = [{**times, **{v: [1.0] * 48 for v in variables}}
+                    for _ in body["latitude"]]
+
+        payload = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def fetch(api: RebaseAPI) -> float:
+    """Seconds to fetch the Hornsea grid, the PES10 points and the demand points."""
+
+    start = time.perf_counter()
+    api.fetch_all({
+        "hornsea": api.get_hornsea_dwd,
+        "solar": lambda: api.get_pes10_nwp("DWD_ICON-EU"),
+        "demand": lambda: api.get_demand_nwp("DWD_ICON-EU")
+    })
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--delay", type=float, default=0.2,
+                        help="seconds the stub waits before it answers")
+    parser.add_argument("--failures", type=int, default=2,
+                        help="number of requests the stub answers with 503")
+    args = parser.parse_args()
+
+    StubHandler.delay = args.delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        for max_workers in (1, 4):
+            StubHandler.failures = args.failures
+            api = RebaseAPI(api_key="stub", base_url=base_url, max_workers=max_workers,
+                            backoff_factor=0.05)
+            seconds = fetch(api)
+            logger.info("max_workers={}: {:.2f}s, {} failed requests retried",
+                        max_workers, seconds, args.failures)
+            logger.info("Latencies:\n{}", api.latency_summary().to_string())
+
+        StubHandler.failures = 0
+        points = RebaseAPI(api_key="stub",
+                           base_url=base_url).get_pes10_nwp("DWD_ICON-EU")
+        streamed = RebaseAPI(api_key="stub", base_url=base_url,
+                             stream_json=True).get_pes10_nwp("DWD_ICON-EU")
+        pd.testing.assert_frame_equal(points, streamed)
+        logger.info("Streamed point response is identical ({} rows)", len(points))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
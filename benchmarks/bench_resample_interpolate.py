@@ -0,0 +1,67 @@
+"""
+Benchmark: groupby-resample vs. vectorised 30-minute interpolation of
+ICON-EU files.
+"""
+
+import argparse
+from pathlib import Path
+import timeit
+
+from loguru import logger
+import pandas as pd
+import xarray as xr
+
+from dopro2_HEFTcom_challenge.utils import (
+    resample_interpolate,
+    resample_interpolate_vectorized
+)
+
+
+def hourly_forecasts(file: Path) -> pd.DataFrame:
+    """Spatially averaged forecasts of a file, as load_weather_data builds them."""
+
+    dimension = ["latitude", "longitude"] if "hornsea" in file.name else ["point"]
+    with xr.open_dataset(file) as dataset:
+        df = dataset.mean(dim=dimension).to_dataframe().reset_index()
+    df = df.rename(columns={"ref_datetime": "reference_time",
+                            "valid_datetime": "valid_time"})
+    return df.assign(
+        reference_time=df["reference_time"].dt.tz_localize("UTC"),
+        hours_after=df["valid_time"],
+        valid_time=(
+            df["reference_time"] + pd.to_timedelta(df["valid_time"], unit="hours")
+        ).dt.tz_localize("UTC")
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", type=Path, default=Path("artifacts/raw_data/weather"),
+                        help="directory with the dwd_icon_eu_*.nc files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    files = sorted(args.data.glob("dwd_icon_eu_*.nc"))
+    if not files:
+        raise FileNotFoundError(f"No dwd_icon_eu_*.nc files in {args.data}")
+
+    totals = {"groupby": 0.0, "vectorized": 0.0}
+    for file in files:
+        df = hourly_forecasts(file)
+        pd.testing.assert_frame_equal(resample_interpolate(df),
+                                      resample_interpolate_vectorized(df),
+                                      check_exact=True)
+        for name, func in [("groupby", resample_interpolate),
+                           ("vectorized", resample_interpolate_vectorized)]:
+            seconds = min(timeit.repeat(lambda: func(df), number=1, repeat=args.repeat))
+            totals[name] += seconds
+            logger.info("{} {}: {:.3f}s for {} rows", file.name, name, seconds, len(df))
+
+    logger.info("Results are identical")
+    logger.info("Total: groupby {:.2f}s, vectorized {:.2f}s ({:.0f}x)",
+                totals["groupby"], totals["vectorized"],
+                totals["groupby"] / totals["vectorized"])
+
+
+if __name__ == "__main__":
+    main()
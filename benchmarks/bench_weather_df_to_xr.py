@@ -0,0 +1,91 @@
+"""Benchmark: melt/pivot vs. NumPy reshaping of grid responses in weather_df_to_xr."""
+
+import argparse
+import timeit
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from dopro2_HEFTcom_challenge.utils import weather_df_to_xr
+
+
+LATITUDES = [53.77, 53.84, 53.9, 53.97, 54.03, 54.1]
+LONGITUDES = [1.702, 1.767, 1.832, 1.897, 1.962, 2.027]
+VARIABLES = ["WindSpeed", "WindSpeed:100", "WindDirection", "WindDirection:100",
+             "Temperature", "RelativeHumidity"]
+
+
+def with_melt(weather_data: pd.DataFrame) -> xr.Dataset:
+    """Previous implementation of weather_df_to_xr for grid responses."""
+
+    weather_data = weather_data.copy()
+    weather_data["ref_datetime"] = pd.to_datetime(weather_data["ref_datetime"],
+                                                  utc=True)
+    weather_data["valid_datetime"] = pd.to_datetime(weather_data["valid_datetime"],
+                                                    utc=True)
+    weather_data = pd.melt(weather_data, id_vars=["ref_datetime", "valid_datetime"])
+    weather_data = (
+        pd.concat(
+            [weather_data, weather_data["variable"].str.split("_", expand=True)],
+            axis=1
+        )
+        .drop(["variable", 1, 3], axis=1)
+        .rename(columns={0: "variable", 2: "latitude", 4: "longitude"})
+        .set_index(["ref_datetime", "valid_datetime", "longitude", "latitude"])
+        .pivot(columns="variable", values="value")
+    )
+    weather_data = weather_data.to_xarray()
+    weather_data["ref_datetime"] = pd.DatetimeIndex(
+        weather_data["ref_datetime"].values, tz="UTC"
+    )
+    weather_data["valid_datetime"] = pd.DatetimeIndex(
+        weather_data["valid_datetime"].values, tz="UTC"
+    )
+    return weather_data
+
+
+def grid_response(n_refs: int, n_valid: int, seed: int = 0) -> pd.DataFrame:
+    """Wide grid response as returned by the Rebase weather API."""
+
+    rng = np.random.default_rng(seed)
+    refs = pd.date_range("2024-05-01", periods=n_refs, freq="6h", tz="UTC")
+    rows = pd.MultiIndex.from_product(
+        [refs, pd.timedelta_range(0, periods=n_valid, freq="1h")]
+    ).to_frame(index=False, name=["ref", "lead"])
+    data = {
+        "ref_datetime": rows["ref"].dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "valid_datetime": (rows["ref"] + rows["lead"]).dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    }
+    for variable in VARIABLES:
+        for lat in LATITUDES:
+            for lon in LONGITUDES:
+                values = rng.normal(size=len(rows))
+                values[rng.random(len(rows)) < 0.01] = np.nan
+                data[f"{variable}_latitude_{lat}_longitude_{lon}"] = values
+    return pd.DataFrame(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--refs", type=int, default=4, help="number of NWP runs")
+    parser.add_argument("--valid", type=int, default=120, help="lead times per run")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = grid_response(args.refs, args.valid)
+    xr.testing.assert_identical(with_melt(df), weather_df_to_xr(df))
+    # an incomplete grid is filled with NaN in both versions
+    partial = df.drop(columns=df.columns[5:9]).iloc[::2]
+    xr.testing.assert_identical(with_melt(partial), weather_df_to_xr(partial))
+    logger.info("Results are identical")
+
+    for name, func in [("melt/pivot", with_melt), ("numpy", weather_df_to_xr)]:
+        seconds = min(timeit.repeat(lambda: func(df), number=1, repeat=args.repeat))
+        logger.info("{}: {:.1f} ms for {} rows x {} columns",
+                    name, 1000 * seconds, *df.shape)
+
+
+if __name__ == "__main__":
+    main()
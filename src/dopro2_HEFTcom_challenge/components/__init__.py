@@ -1,14 +1,42 @@
 """Module for the components."""
 
-from dopro2_HEFTcom_challenge.components.data_ingestion import DataIngestion
-from dopro2_HEFTcom_challenge.components.data_preparation import DataPreparation
-from dopro2_HEFTcom_challenge.components.evaluation import Evaluation
-from dopro2_HEFTcom_challenge.components.training import Training
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Final
+
+if TYPE_CHECKING:
+    from dopro2_HEFTcom_challenge.components.backtest import Backtest
+    from dopro2_HEFTcom_challenge.components.data_ingestion import DataIngestion
+    from dopro2_HEFTcom_challenge.components.data_preparation import DataPreparation
+    from dopro2_HEFTcom_challenge.components.evaluation import Evaluation
+    from dopro2_HEFTcom_challenge.components.training import Training
 
 
 __all__: list[str] = [
+    "Backtest",
     "DataIngestion",
     "DataPreparation",
     "Evaluation",
     "Training"
 ]
+
+# components are imported on first use, so a stage only loads the
+# dependencies (mlflow, statsmodels, xarray, ...) of its own component
+_LAZY_IMPORTS: Final = {
+    "Backtest": "dopro2_HEFTcom_challenge.components.backtest",
+    "DataIngestion": "dopro2_HEFTcom_challenge.components.data_ingestion",
+    "DataPreparation": "dopro2_HEFTcom_challenge.components.data_preparation",
+    "Evaluation": "dopro2_HEFTcom_challenge.components.evaluation",
+    "Training": "dopro2_HEFTcom_challenge.components.training"
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,238 @@
+"""Rolling-origin backtest component."""
+
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+from pathlib import Path
+import time
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+
+from dopro2_HEFTcom_challenge.components.training import Training
+from dopro2_HEFTcom_challenge.entity import BacktestConfig, QuantileModelBundle
+from dopro2_HEFTcom_challenge.utils import (
+    WarmStartQuantReg,
+    pinball_scores,
+    read_parquet_projected
+)
+
+
+def _data_fingerprint(data: pd.DataFrame) -> str:
+    """Fingerprint of the columns, content and index of a data frame."""
+
+    sha = hashlib.sha256(",".join(map(str, data.columns)).encode())
+    sha.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def _run_fold(
+    design_dir: Path,
+    fold: dict,
+    quantiles: list[int],
+    max_iter: int,
+    warm_start: bool
+) -> dict:
+    """
+    Fit all quantiles on the training rows of a fold and score the test rows.
+    The design matrices of the fold are memory mapped from design_dir.
+    """
+
+    start = time.perf_counter()
+    train_endog, train_exog, test_endog, test_exog = (
+        np.load(design_dir / f"{name}.npy", mmap_mode="r")
+        for name in ("train_endog", "train_exog", "test_endog", "test_exog")
+    )
+
+    model = WarmStartQuantReg(train_endog, train_exog)
+    params = {}
+    iterations = 0
+    if warm_start:
+        order = Training.warm_start_order(quantiles)
+    else:
+        order = [(q, None) for q in quantiles]
+    for q, seed in order:
+        results = model.fit(q=q / 100, max_iter=max_iter,
+                            start_params=None if seed is None else params[seed])
+        params[q] = results.params
+        iterations += results.iterations
+
+    predictions = test_exog @ np.column_stack([params[q] for q in quantiles])
+    predictions.sort(axis=1)
+    np.clip(predictions, 0, None, out=predictions)
+    scores = pinball_scores(test_endog, predictions, quantiles)["quantile"]["pinball"]
+
+    row = {key: value for key, value in fold.items() if not key.endswith("_rows")}
+    row.update({
+        "n_train": len(train_endog),
+        "n_test": len(test_endog),
+        **scores.to_dict(),
+        "score": float(scores.mean()),
+        "iterations": iterations,
+        "seconds": round(time.perf_counter() - start, 3)
+    })
+    return row
+
+
+class Backtest:
+    """Class to perform a rolling-origin backtest over reference_time."""
+
+    def __init__(self, config: BacktestConfig) -> None:
+        """
+        Constructor for Backtest class.
+
+        :param config: config values from config.yaml
+        """
+
+        self.config = config
+
+    def folds(self, reference_times: pd.Series) -> list[dict]:
+        """
+        Split the sorted reference times into training and test periods.
+
+        Each fold is scored on ``test_length`` after its origin. The
+        training period starts at the first reference time (expanding
+        window) or ``train_length`` before the origin (sliding window).
+        The origins start ``train_length`` after the first reference time
+        and move on by ``step``.
+
+        :param reference_times: sorted reference times of the data rows
+        :return: time ranges and row ranges of the folds
+        :rtype: list[dict]
+        """
+
+        if self.config.window not in ("expanding", "sliding"):
+            raise ValueError("window must be 'expanding' or 'sliding'")
+        train_length = pd.Timedelta(self.config.train_length)
+        test_length = pd.Timedelta(self.config.test_length)
+        step = pd.Timedelta(self.config.step)
+
+        first, last = reference_times.iloc[0], reference_times.iloc[-1]
+        folds = []
+        origin = first + train_length
+        while origin <= last:
+            if self.config.window == "expanding":
+                train_start = first
+            else:
+                train_start = origin - train_length
+            test_end = origin + test_length
+            rows = reference_times.searchsorted([train_start, origin, test_end])
+            if rows[1] > rows[0] and rows[2] > rows[1]:
+                folds.append({
+                    "fold": len(folds),
+                    "train_start": train_start,
+                    "train_end": origin,
+                    "test_start": origin,
+                    "test_end": test_end,
+                    "train_rows": (int(rows[0]), int(rows[1])),
+                    "test_rows": (int(rows[1]), int(rows[2]))
+                })
+            origin += step
+        return folds
+
+    def design_matrix(
+        self,
+        data: pd.DataFrame,
+        fold: dict,
+        data_fingerprint: str | None = None
+    ) -> Path:
+        """
+        Build the design matrices of a fold and store them as .npy files.
+
+        As in the training stage, the spline knots and bounds are placed on
+        the training rows of the fold only. The test rows are transformed
+        with these knots like in QuantileModelBundle.predict, so no
+        information of the test period leaks into the basis. Rows with
+        missing values are dropped per fold, as patsy does in the training
+        stage. The files are keyed by the formula, a fingerprint of the data
+        and the rows of the fold, so a repeated backtest on unchanged data
+        skips the basis.
+
+        :param data: data sorted by reference_time
+        :param fold: fold with its train_rows and test_rows
+        :param data_fingerprint: fingerprint of ``data``, computed if None
+        :return: directory with the endog and exog of the training and test rows
+        :rtype: Path
+        """
+
+        if data_fingerprint is None:
+            data_fingerprint = _data_fingerprint(data)
+        key = hashlib.sha256(self.config.formula.encode())
+        key.update(data_fingerprint.encode())
+        key.update(f"{fold['train_rows']}{fold['test_rows']}".encode())
+        design_dir = Path(self.config.root_dir) / "design_cache" / key.hexdigest()[:16]
+        if (design_dir / "test_exog.npy").exists():
+            logger.info("Using cached design matrices of fold {} at {}",
+                        fold["fold"], design_dir)
+            return design_dir
+
+        train = data.iloc[fold["train_rows"][0]:fold["train_rows"][1]].dropna()
+        test = data.iloc[fold["test_rows"][0]:fold["test_rows"][1]].dropna()
+        n_rows = sum(end - start for start, end in (fold["train_rows"],
+                                                    fold["test_rows"]))
+        n_dropped = n_rows - len(train) - len(test)
+        if n_dropped:
+            logger.info("Dropped {} rows with missing values from fold {}",
+                        n_dropped, fold["fold"])
+        model = smf.quantreg(formula=self.config.formula, data=train)
+        # only the basis of the bundle is used, not its coefficients
+        bundle = QuantileModelBundle(
+            self.config.quantiles,
+            QuantileModelBundle.formula_terms(model.data.design_info),
+            np.zeros((model.exog.shape[1], len(self.config.quantiles)))
+        )
+        test_endog = test[model.endog_names].to_numpy(dtype=np.float64)
+        test_exog = bundle.design_matrix(test)
+        if model.nobs != len(train):
+            raise ValueError(f"The formula dropped {len(train) - model.nobs:.0f} "
+                             f"complete rows of fold {fold['fold']}.")
+
+        design_dir.mkdir(parents=True, exist_ok=True)
+        np.save(design_dir / "train_endog.npy", model.endog)
+        np.save(design_dir / "train_exog.npy", model.exog)
+        np.save(design_dir / "test_endog.npy", test_endog)
+        np.save(design_dir / "test_exog.npy", test_exog)
+        logger.info("Saved design matrices of fold {} with shapes {} and {} at {}",
+                    fold["fold"], model.exog.shape, test_exog.shape, design_dir)
+        return design_dir
+
+    def run(self) -> pd.DataFrame:
+        """
+        Run all folds and write the scores per fold to a parquet file.
+
+        :return: pinball score per fold and quantile
+        :rtype: DataFrame
+        """
+
+        data = read_parquet_projected(
+            self.config.data_path,
+            columns=list(dict.fromkeys(["reference_time", *self.config.columns])),
+            start=self.config.reference_time_start,
+            end=self.config.reference_time_end
+        )
+        data = data.sort_values("reference_time", kind="stable", ignore_index=True)
+        folds = self.folds(data["reference_time"])
+        logger.info("Backtest with {} folds on {} rows", len(folds), len(data))
+        data = data.drop(columns="reference_time")
+        fingerprint = _data_fingerprint(data)
+        design_dirs = [self.design_matrix(data, fold, fingerprint) for fold in folds]
+
+        args = (self.config.quantiles, self.config.max_iter, self.config.warm_start)
+        if self.config.n_workers > 1:
+            with ProcessPoolExecutor(max_workers=self.config.n_workers) as executor:
+                futures = [executor.submit(_run_fold, design_dir, fold, *args)
+                           for design_dir, fold in zip(design_dirs, folds)]
+                rows = [future.result() for future in futures]
+        else:
+            rows = [_run_fold(design_dir, fold, *args)
+                    for design_dir, fold in zip(design_dirs, folds)]
+        for row in rows:
+            logger.info("Fold {} ({} - {}): pinball score {:.4f}",
+                        row["fold"], row["test_start"], row["test_end"], row["score"])
+
+        results = pd.DataFrame(rows)
+        Path(self.config.results_path).parent.mkdir(parents=True, exist_ok=True)
+        results.to_parquet(self.config.results_path, index=False)
+        logger.info("Backtest results saved at {}", self.config.results_path)
+        return results
@@ -1,31 +1,58 @@
 """Data preparation component."""
 
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import repeat
+import json
 import os
 from pathlib import Path
-from typing import Final
+import shutil
+import threading
+from typing import Callable, Final, Literal
 import numpy as np
 
 from loguru import logger
 # import numpy as np
 import pandas as pd
-import re
 # import xarray as xr
 from sklearn.decomposition import PCA
-from sklearn.preprocessing import (
-    OneHotEncoder,
-    StandardScaler
-)
+from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
-from dopro2_HEFTcom_challenge.entity import DataPreparationConfig
+from dopro2_HEFTcom_challenge.entity import DataPreparationConfig, FileManifest
 from dopro2_HEFTcom_challenge.utils import (
-    categorize_wind_dir,
-    get_season,
-    get_time_of_day,
-    load_weather_data
+    add_calendar_features,
+    align_nwp_models,
+    apply_dtype_policy,
+    encode_categorical_features,
+    fit_feature_encoder,
+    load_weather_data,
+    merge_weather_data,
+    read_partitioned_parquet,
+    remove_partitioned_files,
+    write_partitioned_parquet
 )
 
 
+# name of the sites in the weather files of every NWP model by data type
+WEATHER_SITES: Final = {"hornsea": "hornsea", "solar": "pes10"}
+
+
+def _process_weather_file(
+    file: Path,
+    dtype: Literal["hornsea", "solar"],
+    output_dir: Path,
+    compression: str,
+    reducers: list[dict] | None = None
+) -> pd.DataFrame:
+    """Load one weather file and write it into the partitioned dataset."""
+
+    # the features are computed in full precision, see DataPreparation._to_parquet
+    df = load_weather_data(file, dtype, reducers=reducers)
+    write_partitioned_parquet(df, output_dir, basename=file.stem,
+                              compression=compression)
+    return df
+
+
 class DataPreparation:
     """Class to performe data preparation."""
 
@@ -37,16 +64,115 @@ class DataPreparation:
         """
 
         self.config = config
+        self.memory_report: dict[str, dict] = {}
+        self._writer: ThreadPoolExecutor | None = None
+        self._pending_writes: list[Future] = []
+        # process pool shared by the weather files of all NWP models
+        self._pool: ProcessPoolExecutor | None = None
+        # the datasets of the NWP models are updated in parallel
+        self._manifest: FileManifest | None = None
+        self._manifest_lock = threading.Lock()
+
+    def _to_parquet(self, df: pd.DataFrame, path: str | Path) -> pd.DataFrame:
+        """
+        Apply the dtype policy, write the data with the configured codec
+        and record the memory saved by the policy, see ``save_memory_report``.
+
+        The file is only written if its name is one of the configured
+        checkpoints. With ``async_checkpoints`` it is written on one of
+        ``n_writers`` background threads, call ``wait_for_checkpoints``
+        before reading it.
+
+        :param df: data to write
+        :param path: parquet file
+        :return: downcasted data
+        :rtype: DataFrame
+        """
+
+        lean_df = apply_dtype_policy(df, self.config.dtype_policy)
+        checkpoints = self.config.checkpoints
+        if checkpoints is None or Path(path).stem in checkpoints:
+            self._write_checkpoint(lean_df, path)
+
+        before = int(df.memory_usage(deep=True).sum())
+        after = int(lean_df.memory_usage(deep=True).sum())
+        self.memory_report[Path(path).name] = {
+            "rows": len(df),
+            "memory_before_mb": round(before / 2**20, 2),
+            "memory_after_mb": round(after / 2**20, 2),
+            "saved_percent": round(100 * (1 - after / before), 1) if before else 0.0
+        }
+        logger.info("{}: {:.1f} MB -> {:.1f} MB in memory",
+                    Path(path).name, before / 2**20, after / 2**20)
+
+        return lean_df
+
+    def _write_checkpoint(self, df: pd.DataFrame, path: str | Path) -> None:
+        compression = self.config.dtype_policy["compression"]
+        if not self.config.async_checkpoints:
+            df.to_parquet(path, compression=compression)
+            return
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=self.config.n_writers,
+                                              thread_name_prefix="checkpoint")
+        # the later steps add or drop columns of the returned frame,
+        # a shallow copy keeps the written columns fixed
+        self._pending_writes.append(self._writer.submit(
+            df.copy(deep=False).to_parquet, path, compression=compression
+        ))
+
+    def wait_for_checkpoints(self) -> None:
+        """
+        Wait until all checkpoints are written.
+
+        :raises Exception: the first error raised while writing a checkpoint
+        """
+
+        pending, self._pending_writes = self._pending_writes, []
+        wait(pending)
+        for future in pending:
+            future.result()
+        if pending:
+            logger.info("Written {} checkpoints under {}", len(pending),
+                        self.config.root_dir)
+
+    def save_memory_report(self) -> None:
+        """Write the memory saved by the dtype policy per frame to a JSON file."""
+
+        with open(f"{self.config.root_dir}/memory_report.json", "w",
+                  encoding="utf-8") as f:
+            json.dump(self.memory_report, f, indent=2)
+        logger.info("Memory report saved under {}", self.config.root_dir)
 
     def cleaning_energy_data(self) -> pd.DataFrame:
 
         logger.info("Start cleaning energy data")
         energy_files = Path(self.config.energy_data_path).glob("*.csv")
+
+        if self.config.incremental:
+            df = self._update_dataset(
+                sorted(energy_files), "*.csv",
+                Path(self.config.root_dir) / "energy_processed",
+                self._write_energy_files, sort_by=["dtm"]
+            )
+            logger.info("Cleaned energy data: dataset updated under {}",
+                        self.config.root_dir)
+            return df
+
         df_raw = pd.concat(
             (pd.read_csv(f) for _, f in enumerate(energy_files)),
             ignore_index=True
         )
-        df = (
+        df = self._clean_energy(df_raw)
+
+        self._to_parquet(df, f"{self.config.root_dir}/energy_processed.parquet")
+        logger.info("Cleaned energy data: file safed under {}", self.config.root_dir)
+
+        return df
+
+    @staticmethod
+    def _clean_energy(df_raw: pd.DataFrame) -> pd.DataFrame:
+        return (
             df_raw
             .assign(dtm=pd.to_datetime(df_raw["dtm"]),
                     Wind_MWh_credit=0.5 * df_raw["Wind_MW"] - df_raw["boa_MWh"],
@@ -54,95 +180,225 @@ class DataPreparation:
                     )
         )
 
-        df.to_parquet(f"{self.config.root_dir}/energy_processed.parquet")
-        logger.info("Cleaned energy data: file safed under {}", self.config.root_dir)
+    def _write_energy_files(self, files: list[Path], output_dir: Path) -> None:
+        for file in files:
+            df = self._clean_energy(pd.read_csv(file))
+            write_partitioned_parquet(
+                df, output_dir, basename=file.stem, time_column="dtm",
+                compression=self.config.dtype_policy["compression"]
+            )
 
-        return df
+    def cleaning_weather_data(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Load the forecasts of all NWP models in nwp_sources.
+
+        The weather files of all models are loaded in one pass, with
+        ``n_workers`` > 1 they share one process pool. The forecasts of
+        the further models are aligned to the first (primary) model on
+        ``valid_time`` and their columns are suffixed. Models without
+        Hornsea or solar files are skipped.
+
+        :return: aligned Hornsea and solar forecasts
+        :rtype: tuple[DataFrame, DataFrame]
+        """
 
-    def cleaning_weather_data(self):
         logger.info("Start cleaning weather data")
         weather_files = sorted(Path(self.config.weather_data_path).glob("*.nc"))
 
-        dwd_hornsea_rx = re.compile("dwd_icon_eu_hornsea")
-        dwd_hornsea_files = [f for f in weather_files if dwd_hornsea_rx.match(f.stem)]
-        dwd_hornsea_df = pd.concat(
-            (load_weather_data(f, "hornsea")
-             for _, f in enumerate(dwd_hornsea_files)),
-            ignore_index=True
-        )
-        dwd_hornsea_df.to_parquet(
-            f"{self.config.root_dir}/dwd_hornsea_processed.parquet"
+        primary, *further = self.config.nwp_sources
+        groups = {}
+        for source in self.config.nwp_sources:
+            reducers = source.get("spatial_reducers", self.config.spatial_reducers)
+            source_groups = {}
+            for dtype, site in WEATHER_SITES.items():
+                prefix = f"{source['files']}_{site}"
+                source_groups[source["name"], dtype] = (
+                    [f for f in weather_files if f.stem.startswith(prefix)], dtype,
+                    f"{source['name']}_{dtype}_processed", f"{prefix}*.nc",
+                    reducers.get(dtype)
+                )
+            if source is not primary and not all(g[0] for g in source_groups.values()):
+                logger.warning("No weather files of {} found, the model is skipped",
+                               source["model"])
+                continue
+            groups.update(source_groups)
+
+        if self.config.n_workers > 1 and len(groups) > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.config.n_workers)
+            try:
+                with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                    futures = {key: executor.submit(self._load_weather_files, *group)
+                               for key, group in groups.items()}
+                    loaded = {key: future.result() for key, future in futures.items()}
+            finally:
+                self._pool.shutdown()
+                self._pool = None
+        else:
+            loaded = {key: self._load_weather_files(*group)
+                      for key, group in groups.items()}
+        for name, dtype in loaded:
+            logger.info("Cleaned {} {} data: file safed under {}",
+                        name, dtype, self.config.root_dir)
+
+        hornsea, solar = (
+            align_nwp_models(
+                loaded[primary["name"], dtype],
+                {s["suffix"]: loaded[s["name"], dtype] for s in further
+                 if (s["name"], dtype) in loaded},
+                self.config.nwp_max_run_age
+            )
+            for dtype in WEATHER_SITES
         )
-        logger.info("Cleaned dwd hornsea data: file safed under {}",
-                    self.config.root_dir)
+        return hornsea, solar
+
+    def _load_weather_files(
+        self,
+        files: list[Path],
+        dtype: Literal["hornsea", "solar"],
+        name: str,
+        pattern: str,
+        reducers: list[dict] | None = None
+    ) -> pd.DataFrame:
+        """
+        Load and preprocess weather files and write the result to parquet.
+
+        With ``n_workers`` > 1 the files are spread over a process pool and
+        every worker writes its part into the partitioned dataset
+        ``<root_dir>/<name>/``. The results are concatenated in file order,
+        so the returned DataFrame is the same as in the serial path.
+        In incremental mode only new or changed files are processed and
+        the dataset is updated in place.
+
+        :param files: sorted NetCDF files of one data type
+        :param dtype: wind (hornsea) or solar data
+        :param name: name of the output artifact
+        :param pattern: glob pattern of the files, used to detect removed files
+        :param reducers: spatial reducers, see ``reduce_spatial``
+        :return: preprocessed weather data of all files
+        :rtype: DataFrame
+        """
 
-        dwd_solar_rx = re.compile("dwd_icon_eu_pes10")
-        dwd_solar_files = [f for f in weather_files if dwd_solar_rx.match(f.stem)]
-        dwd_solar_df = pd.concat(
-            (load_weather_data(f, "solar")
-             for _, f in enumerate(dwd_solar_files)),
+        output_dir = Path(self.config.root_dir) / name
+
+        if self.config.incremental:
+            return self._update_dataset(
+                files, pattern, output_dir,
+                lambda changed, out: self._map_weather_files(changed, dtype, out,
+                                                             reducers),
+                sort_by=["reference_time", "valid_time"]
+            )
+
+        if self.config.n_workers <= 1:
+            df = pd.concat(
+                (load_weather_data(f, dtype, reducers=reducers) for f in files),
+                ignore_index=True
+            )
+            # only the checkpoint is downcasted, like in the parallel path
+            self._to_parquet(df, f"{self.config.root_dir}/{name}.parquet")
+            return df
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return pd.concat(
+            self._map_weather_files(files, dtype, output_dir, reducers),
             ignore_index=True
         )
-        dwd_solar_df.to_parquet(f"{self.config.root_dir}/dwd_solar_processed.parquet")
-        logger.info("Cleaned dwd solar data: file safed under {}", self.config.root_dir)
 
-        return dwd_hornsea_df, dwd_solar_df
+    def _map_weather_files(
+        self,
+        files: list[Path],
+        dtype: Literal["hornsea", "solar"],
+        output_dir: Path,
+        reducers: list[dict] | None = None
+    ) -> list[pd.DataFrame]:
+        if self.config.n_workers <= 1:
+            return [_process_weather_file(f, dtype, output_dir,
+                                          self.config.dtype_policy["compression"],
+                                          reducers)
+                    for f in files]
+
+        logger.info("Loading {} {} files with {} workers",
+                    len(files), dtype, self.config.n_workers)
+        args = (files, repeat(dtype), repeat(output_dir),
+                repeat(self.config.dtype_policy["compression"]), repeat(reducers))
+        if self._pool is not None:
+            return list(self._pool.map(_process_weather_file, *args))
+        with ProcessPoolExecutor(max_workers=self.config.n_workers) as executor:
+            return list(executor.map(_process_weather_file, *args))
+
+    def _update_dataset(
+        self,
+        files: list[Path],
+        pattern: str,
+        output_dir: Path,
+        process: Callable[[list[Path], Path], object],
+        sort_by: list[str]
+    ) -> pd.DataFrame:
+        """
+        Bring a partitioned parquet dataset up to date with its source files.
+
+        Files of removed or changed sources are deleted from the dataset,
+        then ``process`` writes the new or changed files and the manifest is
+        updated. Unchanged files are not read again.
+
+        :param files: current source files
+        :param pattern: glob pattern of the source files
+        :param output_dir: root directory of the parquet dataset
+        :param process: writes the given files into the dataset
+        :param sort_by: columns to sort the complete dataset by
+        :return: complete data of the dataset
+        :rtype: DataFrame
+        """
+
+        with self._manifest_lock:
+            if self._manifest is None:
+                self._manifest = FileManifest(self.config.manifest_path)
+            manifest = self._manifest
+
+            for file in manifest.removed_files(files, pattern):
+                logger.info("Source file {} was removed", file)
+                remove_partitioned_files(output_dir, file.stem)
+                manifest.remove(file)
+
+            changed_files = manifest.changed_files(files)
+        logger.info("{} of {} files in {} are new or changed",
+                    len(changed_files), len(files), output_dir)
+        if changed_files:
+            for file in changed_files:
+                remove_partitioned_files(output_dir, file.stem)
+            process(changed_files, output_dir)
+        with self._manifest_lock:
+            for file in changed_files:
+                manifest.update(file)
+            manifest.save()
+
+        if not output_dir.exists():
+            raise FileNotFoundError(f"No data found for dataset {output_dir}")
+        return read_partitioned_parquet(output_dir, sort_by=sort_by)
+
+    def _nwp_suffixes(self, df: pd.DataFrame) -> tuple[str, ...]:
+        """Suffixes of the NWP models whose forecasts are in the data, "" first."""
+
+        return ("",) + tuple(source["suffix"] for source in self.config.nwp_sources[1:]
+                             if f"WindSpeed{source['suffix']}" in df.columns)
 
     def merge_data(self, energy, hornsea, solar) -> None:
         logger.info("Start merging energy and weather data")
 
         merged_table = (
-            hornsea
-            .merge(solar, how="outer", on=["reference_time", "valid_time"])
+            merge_weather_data(hornsea, solar, self._nwp_suffixes(hornsea))
             .merge(energy, how="inner", left_on="valid_time", right_on="dtm")
-            .rename(columns={"Temperature_x": "temp_hornsea",
-                             "Temperature_y": "temp_solar",
-                             "hours_after_x": "hours_after"})
-            .drop(columns="hours_after_y", axis=1)
         )
 
-        merged_table = merged_table.assign(
-            year=merged_table["valid_time"].dt.year,
-            month=merged_table["valid_time"].dt.month,
-            day=merged_table["valid_time"].dt.day,
-            hour=merged_table["valid_time"].dt.hour,
-            season=merged_table["valid_time"].dt.month.apply(get_season),
-            time_of_day=merged_table["valid_time"].dt.hour.apply(get_time_of_day),
-            wind_dir_cat=merged_table["WindDirection:100"].apply(categorize_wind_dir)
-        )
-
-        time_of_day_categories = merged_table[["time_of_day"]]
-        time_of_day_encoder = OneHotEncoder()
-        time_of_day_encoded = time_of_day_encoder.fit_transform(time_of_day_categories)
-        time_of_day_encoded_df = pd.DataFrame(
-            time_of_day_encoded.toarray(),
-            columns=time_of_day_encoder.get_feature_names_out()
-        )
-
-        season_categories = merged_table[["season"]]
-        season_encoder = OneHotEncoder()
-        season_encoded = season_encoder.fit_transform(season_categories)
-        season_encoded_df = pd.DataFrame(
-            season_encoded.toarray(),
-            columns=season_encoder.get_feature_names_out()
-        )
-
-        windDir_categories = merged_table[["wind_dir_cat"]]
-        windDir_encoder = OneHotEncoder()
-        windDir_encoded = windDir_encoder.fit_transform(windDir_categories)
-        windDir_encoded_df = pd.DataFrame(
-            windDir_encoded.toarray(),
-            columns=windDir_encoder.get_feature_names_out()
-        )
-
-        concat_tables = [merged_table, time_of_day_encoded_df,
-                         season_encoded_df, windDir_encoded_df]
-        merged_table = pd.concat(concat_tables, axis=1)
+        merged_table = add_calendar_features(merged_table)
+        encoder = fit_feature_encoder(merged_table, self.config.feature_encoder_path)
+        merged_table = encode_categorical_features(merged_table, encoder)
 
         # Der Zeitraum der Messungen endet am 19.05.2024 23:30 Uhr -> Alle Wettervorhersagen danach sind nicht relevant und können gedropped werden
         merged_table = merged_table.drop(merged_table[merged_table.valid_time >= "2024-05-20"].index).reset_index(drop=True)
 
-        merged_table.to_parquet(f"{self.config.root_dir}/merged_data.parquet")
+        # the checkpoint is downcasted, the features are computed from the
+        # data in full precision
+        self._to_parquet(merged_table, f"{self.config.root_dir}/merged_data.parquet")
         logger.info("Merged energy and weather data: file safed under {}",
                     self.config.root_dir)
         return merged_table
@@ -150,35 +406,67 @@ class DataPreparation:
     def create_features(self, merged_table):
         merged_table_features = merged_table
        
-        # Berechnung der angepassten Sonnenstrahlung unter Berücksichtigung der Bewölkung
-        merged_table_features['adjusted_solar_radiation'] = merged_table_features['SolarDownwardRadiation'] * (1 - merged_table_features['CloudCover'] / 100)
-
-        # Interaktion zwischen Temperatur (x) und Sonnenstrahlung
-        merged_table_features['temp_x_solar_interaction'] = merged_table_features['temp_hornsea'] * merged_table_features['SolarDownwardRadiation']
-        # Interaktion zwischen Temperatur (y) und Sonnenstrahlung
-        merged_table_features['temp_y_solar_interaction'] = merged_table_features['temp_solar'] * merged_table_features['SolarDownwardRadiation']
-
-        # Berechnung der Windinteraktion unter Verwendung von Windgeschwindigkeit und -richtung
-        merged_table_features['wind_interaction'] = merged_table_features['WindSpeed'] * np.cos(merged_table_features['WindDirection'])
-        # Windinteraktion für Windgeschwindigkeit in 100 m Höhe
-        merged_table_features['wind_interaction_100'] = merged_table_features['WindSpeed:100'] * np.cos(merged_table_features['WindDirection:100'])
-
-        # Interaktion zwischen relativer Luftfeuchtigkeit und Windgeschwindigkeit
-        merged_table_features['humidity_wind_interaction'] = merged_table_features['RelativeHumidity'] * merged_table_features['WindSpeed']
-
-        # Gradient der Windgeschwindigkeit zwischen 100 m Höhe und Boden
-        merged_table_features['wind_gradient'] = merged_table_features['WindSpeed:100'] * merged_table_features['WindSpeed']
-
-        # Erstellen einer neuen Spalte für die zeitliche Verschiebung der Bewölkung um 1 Stunde
-        merged_table_features['CloudCover_lag_1h'] = merged_table_features['CloudCover'].shift(1)
-        # Berechnung der Änderung der Bewölkung im Vergleich zur vorherigen Stunde
-        merged_table_features['cloud_cover_change'] = merged_table_features['CloudCover'] - merged_table_features['CloudCover_lag_1h']
-        merged_table.to_parquet(f"{self.config.root_dir}/merged_data_features.parquet")
+        df = merged_table_features
+        # die Features werden für jedes NWP-Modell berechnet,
+        # s ist das Suffix des Modells
+        for s in self._nwp_suffixes(df):
+            # Berechnung der angepassten Sonnenstrahlung unter
+            # Berücksichtigung der Bewölkung
+            df[f'adjusted_solar_radiation{s}'] = \
+                df[f'SolarDownwardRadiation{s}'] * (1 - df[f'CloudCover{s}'] / 100)
+
+            # Interaktion zwischen Temperatur (x) und Sonnenstrahlung
+            df[f'temp_x_solar_interaction{s}'] = \
+                df[f'temp_hornsea{s}'] * df[f'SolarDownwardRadiation{s}']
+            # Interaktion zwischen Temperatur (y) und Sonnenstrahlung
+            df[f'temp_y_solar_interaction{s}'] = \
+                df[f'temp_solar{s}'] * df[f'SolarDownwardRadiation{s}']
+
+            # Berechnung der Windinteraktion unter Verwendung von
+            # Windgeschwindigkeit und -richtung
+            df[f'wind_interaction{s}'] = \
+                df[f'WindSpeed{s}'] * np.cos(df[f'WindDirection{s}'])
+            # Windinteraktion für Windgeschwindigkeit in 100 m Höhe
+            df[f'wind_interaction_100{s}'] = \
+                df[f'WindSpeed:100{s}'] * np.cos(df[f'WindDirection:100{s}'])
+
+            # Interaktion zwischen relativer Luftfeuchtigkeit und
+            # Windgeschwindigkeit
+            df[f'humidity_wind_interaction{s}'] = \
+                df[f'RelativeHumidity{s}'] * df[f'WindSpeed{s}']
+
+            # Gradient der Windgeschwindigkeit zwischen 100 m Höhe und Boden
+            df[f'wind_gradient{s}'] = df[f'WindSpeed:100{s}'] * df[f'WindSpeed{s}']
+
+            # Erstellen einer neuen Spalte für die zeitliche Verschiebung
+            # der Bewölkung um 1 Stunde
+            df[f'CloudCover_lag_1h{s}'] = df[f'CloudCover{s}'].shift(1)
+            # Berechnung der Änderung der Bewölkung im Vergleich zur
+            # vorherigen Stunde
+            df[f'cloud_cover_change{s}'] = \
+                df[f'CloudCover{s}'] - df[f'CloudCover_lag_1h{s}']
+        merged_table_features = self._to_parquet(
+            merged_table_features,
+            f"{self.config.root_dir}/merged_data_features.parquet"
+        )
         logger.info("Created features: file safed under {}",
                     self.config.root_dir)
         return merged_table_features
 
-    def splitting_data(self, df_full):
+    def splitting_data(
+        self,
+        df_full: pd.DataFrame,
+        write: bool = True
+    ) -> dict[str, pd.DataFrame]:
+        """
+        Split the data into wind and solar training and test sets.
+
+        :param df_full: merged data with all features
+        :param write: write the splits, see ``write_splits``
+        :return: features (x_*) and labels (y_*) by split name
+        :rtype: dict[str, DataFrame]
+        """
+
         logger.info("Start splitting data in training and test data set")
 
         os.makedirs(self.config.training_data_path, exist_ok=True)
@@ -187,9 +475,6 @@ class DataPreparation:
         os.makedirs(self.config.test_data_path, exist_ok=True)
         logger.info("created directory at: {}", self.config.test_data_path)
 
-        df_train = df_full.loc[~df_full.reference_time.between(left="2023-09-01", right="2023-12-01", inclusive="left")]
-        df_test = df_full.loc[df_full.reference_time.between(left="2023-09-01", right="2023-12-01", inclusive="left")]
-
         label_wind: Final = "Wind_MWh_credit"  # mglw. in config-Datein schreiben
         featues_wind: list = ["RelativeHumidity", "temp_hornsea", "temp_solar",
                               "WindDirection", "WindDirection:100", "WindSpeed",
@@ -213,47 +498,126 @@ class DataPreparation:
                                "season_autumn", "season_spring", "season_summer",
                                "season_winter"]
 
-        index_wind_train = df_train[df_train[label_wind].isna()].index
-        index_solar_train = df_train[df_train[label_solar].isna()].index
-        index_wind_test = df_test[df_test[label_wind].isna()].index
-        index_solar_test = df_test[df_test[label_solar].isna()].index
+        # the test mask is evaluated once, the row indices of every split
+        # select only the projected columns, so the full table is not copied
+        test = df_full["reference_time"].between(
+            left=self.config.test_start, right=self.config.test_end, inclusive="left"
+        ).to_numpy()
+        # the same features of further NWP models, e.g. WindSpeed_gfs
+        suffixes = self._nwp_suffixes(df_full)[1:]
+        splits = {}
+        for name, label, features in (("wind", label_wind, featues_wind),
+                                      ("solar", label_solar, featues_solar)):
+            features = features + [f"{feature}{s}" for s in suffixes
+                                   for feature in features
+                                   if f"{feature}{s}" in df_full.columns]
+            valid = df_full[label].notna().to_numpy()
+            x_columns = df_full.columns.get_indexer(features)
+            y_columns = df_full.columns.get_indexer([label])
+            for part, mask in (("train", ~test & valid), ("test", test & valid)):
+                rows = np.flatnonzero(mask)
+                splits[f"x_{name}_{part}"] = \
+                    df_full.iloc[rows, x_columns].reset_index(drop=True)
+                splits[f"y_{name}_{part}"] = \
+                    df_full.iloc[rows, y_columns].reset_index(drop=True)
+        logger.info("Split {} training and {} test rows",
+                    int((~test).sum()), int(test.sum()))
+
+        if write:
+            splits = self.write_splits(splits)
+        return splits
+
+    def write_splits(self, splits: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+        """
+        Write the training splits into training_data_path and the test
+        splits into test_data_path.
 
-        x_wind_train = df_train.drop(index_wind_train)[featues_wind].reset_index(drop=True)
-        x_wind_train.to_parquet(
-            f"{self.config.training_data_path}/x_wind_train.parquet"
-        )
-        x_wind_test = df_test.drop(index_wind_test)[featues_wind].reset_index(drop=True)
-        x_wind_test.to_parquet(f"{self.config.test_data_path}/x_wind_test.parquet")
-        x_solar_train = df_train.drop(index_solar_train)[featues_solar].reset_index(drop=True)
-        x_solar_train.to_parquet(
-            f"{self.config.training_data_path}/x_solar_train.parquet"
+        :param splits: data by split name, e.g. x_wind_train
+        :return: downcasted data by split name
+        :rtype: dict[str, DataFrame]
+        """
+
+        written = {}
+        for name, df in splits.items():
+            if name.endswith("_train"):
+                directory = self.config.training_data_path
+            else:
+                directory = self.config.test_data_path
+            written[name] = self._to_parquet(df, f"{directory}/{name}.parquet")
+        return written
+
+    def create_model_data(self) -> pd.DataFrame:
+        """
+        Create the data the quantile regression models are trained on.
+
+        Like the model data of reasearch/02_data_preparation.ipynb, only
+        forecasts with a lead time below ``model_data_max_hours_after`` and
+        with a WindSpeed are kept, and the total generation of wind and
+        solar is added as label. Other than in the notebook, WindSpeed is
+        the wind speed at 10 m and not the one at 100 m, because the
+        prediction stage passes the 10 m wind speed to the models. Rows
+        without label are dropped, the fit would drop them anyway.
+
+        :return: features and total_generation_MWh of the selected rows
+        :rtype: DataFrame
+        """
+
+        features_path = Path(self.config.root_dir) / "merged_data_features.parquet"
+        if not features_path.exists():
+            raise FileNotFoundError(
+                f"{features_path} not found, merged_data_features has to be in "
+                "data_preparation.checkpoints"
+            )
+        model_data = pd.read_parquet(features_path)
+        model_data = model_data[
+            (model_data["hours_after"] < self.config.model_data_max_hours_after)
+            & model_data["WindSpeed"].notna()
+        ]
+        model_data = model_data.assign(
+            total_generation_MWh=model_data["Wind_MWh_credit"]
+            + model_data["Solar_MWh_credit"]
         )
-        x_solar_test = df_test.drop(index_solar_test)[featues_solar].reset_index(drop=True)
-        x_solar_test.to_parquet(f"{self.config.test_data_path}/x_solar_test.parquet")
-        y_wind_train = df_train.drop(index_wind_train)[label_wind].reset_index(drop=True)
-        y_wind_train.to_frame()\
-            .to_parquet(f"{self.config.training_data_path}/y_wind_train.parquet")
-        y_wind_test = df_test.drop(index_wind_test)[label_wind].reset_index(drop=True)
-        y_wind_test.to_frame()\
-            .to_parquet(f"{self.config.test_data_path}/y_wind_test.parquet")
-        y_solar_train = df_train.drop(index_solar_train)[label_solar].reset_index(drop=True)
-        y_solar_train.to_frame()\
-            .to_parquet(f"{self.config.training_data_path}/y_solar_train.parquet")
-        y_solar_test = df_test.drop(index_solar_test)[label_solar].reset_index(drop=True)
-        y_solar_test.to_frame()\
-            .to_parquet(f"{self.config.test_data_path}/y_solar_test.parquet")
-
-    def transform_data(self) -> None:
+        model_data = model_data.dropna(subset="total_generation_MWh")
+        model_data = model_data.reset_index(drop=True)
+
+        model_data.to_parquet(self.config.model_data_path,
+                              compression=self.config.dtype_policy["compression"])
+        logger.info("Created model data with {} rows: file safed under {}",
+                    len(model_data), self.config.model_data_path)
+        return model_data
+
+    def transform_data(
+        self,
+        splits: dict[str, pd.DataFrame] | None = None
+    ) -> dict[str, pd.DataFrame] | None:
+        """
+        Replace the two wind speeds of the wind data by their first
+        principal component.
+
+        Without ``splits`` the wind data is read from and written back to
+        the split files.
+
+        :param splits: data from ``splitting_data``
+        :return: splits with the transformed wind data, None if read from files
+        :rtype: dict[str, DataFrame] | None
+        """
+
         logger.info("Start transforming (feature engineering) the data")
 
         logger.info("Transforming the wind data")
 
-        x_wind_train = pd.read_parquet(
-            f"{self.config.training_data_path}/x_wind_train.parquet"
-        )
-        x_wind_test = pd.read_parquet(
-            f"{self.config.test_data_path}/x_wind_test.parquet"
-        )
+        if splits is None:
+            # the split files may still be written in the background
+            self.wait_for_checkpoints()
+            x_wind_train = pd.read_parquet(
+                f"{self.config.training_data_path}/x_wind_train.parquet"
+            )
+            x_wind_test = pd.read_parquet(
+                f"{self.config.test_data_path}/x_wind_test.parquet"
+            )
+        else:
+            x_wind_train = splits["x_wind_train"].copy()
+            x_wind_test = splits["x_wind_test"].copy()
 
         windspeed_train_pca = x_wind_train[["WindSpeed", "WindSpeed:100"]].to_numpy()
         windspeed_test_pca = x_wind_test[["WindSpeed", "WindSpeed:100"]].to_numpy()
@@ -272,10 +636,16 @@ class DataPreparation:
         x_wind_train.drop(columns=["WindSpeed", "WindSpeed:100"], axis=1, inplace=True)
         x_wind_test.drop(columns=["WindSpeed", "WindSpeed:100"], axis=1, inplace=True)
 
-        x_wind_train.to_parquet(
-            f"{self.config.training_data_path}/x_wind_train.parquet"
+        if splits is not None:
+            return {**splits, "x_wind_train": x_wind_train, "x_wind_test": x_wind_test}
+
+        self._to_parquet(
+            x_wind_train, f"{self.config.training_data_path}/x_wind_train.parquet"
+        )
+        self._to_parquet(
+            x_wind_test, f"{self.config.test_data_path}/x_wind_test.parquet"
         )
-        x_wind_test.to_parquet(f"{self.config.test_data_path}/x_wind_test.parquet")
+        return None
         # transformed_df.to_parquet(f"{self.config.root_dir}/transformed_data.parquet")
         # logger.info("Transformed data: file safed under {}",
         #             self.config.root_dir)
@@ -1,24 +1,35 @@
 """Model evaluation component."""
 
+import json
+from pathlib import Path
+import shutil
+import tempfile
+import threading
 from urllib.parse import urlparse
 
 from loguru import logger
 import mlflow
 import mlflow.statsmodels
+import numpy as np
 import pandas as pd
-from statsmodels.base.model import Results
 
-from dopro2_HEFTcom_challenge.entity import EvaluationConfig
-from dopro2_HEFTcom_challenge.utils import load_models
+from dopro2_HEFTcom_challenge.entity import EvaluationConfig, QuantileModelBundle
+from dopro2_HEFTcom_challenge.utils import (
+    load_models,
+    pinball_scores,
+    read_parquet_projected
+)
 
 
 class Evaluation:
     """Class to evaluate the model."""
 
-    models: list[Results]
-    predictions: pd.DataFrame
+    bundle: QuantileModelBundle
+    test_data: pd.DataFrame
+    predictions: np.ndarray
     sample_data: pd.DataFrame
     score: float
+    scores: dict[str, pd.DataFrame]
 
     def __init__(self, config: EvaluationConfig) -> None:
         """
@@ -28,47 +39,127 @@ class Evaluation:
         """
 
         self.config = config
+        self.logging_thread: threading.Thread | None = None
+        self.logging_error: Exception | None = None
 
     @staticmethod
     def pinball_score(df: pd.DataFrame) -> float:
-        def pinball(y, q, alpha):
-            return (y - q) * alpha * (y >= q) + (q - y) * (1 - alpha) * (y < q)
-
-        score = []
-        for qu in range(10, 100, 10):
-            score.append(
-                pinball(
-                    y=df["total_generation_MWh"],
-                    q=df[f"q{qu}"],
-                    alpha=qu / 100
-                ).mean()
-            )
-        return sum(score) / len(score)
+        quantiles = list(range(10, 100, 10))
+        scores = pinball_scores(
+            df["total_generation_MWh"].to_numpy(),
+            df[[f"q{qu}" for qu in quantiles]].to_numpy(),
+            quantiles
+        )
+        return float(scores["quantile"]["pinball"].mean())
 
     def make_predictions(self):
         logger.info("Loading the trained models")
-        self.models = load_models(self.config.path_to_models)
-        test_data = pd.read_parquet(self.config.training_data_path).iloc[400000:]
-        # nur jetzt zum testen mit iloc
-        self.sample_data = test_data.iloc[:5]
+        self.bundle = QuantileModelBundle.load(self.config.model_bundle_path)
+        columns = ["total_generation_MWh", *self.bundle.variables,
+                   *self.config.breakdown_columns]
+        self.test_data = read_parquet_projected(
+            self.config.training_data_path,
+            columns=list(dict.fromkeys(columns)),
+            start=self.config.reference_time_start,
+            end=self.config.reference_time_end
+        )
+        self.sample_data = self.test_data.iloc[:5]
         logger.info("Start making predictions on the trained models.")
-        for i, model in enumerate(self.models):
-            test_data = test_data.copy()
-            test_data[f"q{(i + 1) * 10}"] = model.predict(test_data)
-            test_data.loc[test_data[f"q{(i + 1) * 10}"] < 0, f"q{(i + 1) * 10}"] = 0
-        self.predictions = test_data[["total_generation_MWh",
-                                      "q10", "q20", "q30", "q40", "q50",
-                                      "q60", "q70", "q80", "q90"]]
+        self.predictions = np.empty((len(self.test_data), len(self.bundle.quantiles)))
+        self.bundle.predict(self.test_data, out=self.predictions)
+        np.clip(self.predictions, 0, None, out=self.predictions)
         logger.info("Made predictions on the trained models.")
 
     def evaluation(self):
         logger.info("Calculate the pinball score on the predictions.")
-        self.score = self.pinball_score(self.predictions)
+        self.scores = pinball_scores(
+            self.test_data["total_generation_MWh"].to_numpy(),
+            self.predictions,
+            self.bundle.quantiles,
+            groups={column: self.test_data[column].to_numpy()
+                    for column in self.config.breakdown_columns}
+        )
+        self.score = float(self.scores["quantile"]["pinball"].mean())
         with open("score.txt", "w", encoding="utf-8") as f:
             f.write(f"Pinball Score: {self.score}")
         logger.info("Score file saved at: score.txt")
 
+        breakdown_path = Path(self.config.root_dir) / "pinball_breakdown.json"
+        breakdown = {"score": self.score}
+        for name, frame in self.scores.items():
+            breakdown[name] = json.loads(frame.reset_index().to_json(orient="records"))
+        with breakdown_path.open("w", encoding="utf-8") as f:
+            json.dump(breakdown, f, indent=2)
+        logger.info("Score breakdown saved at: {}", breakdown_path)
+
     def log_into_mlflow(self):
+        if self.config.mlflow_log_mode == "statsmodels":
+            self._log_statsmodels_models()
+            return
+        if self.config.mlflow_log_mode != "bundle":
+            raise ValueError("mlflow_log_mode must be 'bundle' or 'statsmodels'")
+
+        mlflow.set_registry_uri(self.config.mlflow_uri)
+        if self.config.mlflow_async:
+            self.logging_thread = threading.Thread(target=self._log_bundle_run,
+                                                   name="mlflow-logging")
+            self.logging_thread.start()
+            logger.info("Logging to MLflow in the background")
+        else:
+            self._log_bundle_run()
+
+    def _log_bundle_run(self) -> None:
+        """
+        Log params, all metrics in one batch, and the model bundle together
+        with the feature encoder in one artifact upload.
+
+        In async mode this runs on a background thread and the params and
+        metrics are sent with ``synchronous=False``, so they are uploaded
+        while the artifacts are copied. No other MLflow run should be
+        started until wait_for_mlflow returned.
+        """
+
+        metrics = {"pinball score": self.score}
+        for quantile, score in self.scores["quantile"]["pinball"].items():
+            metrics[f"pinball {quantile}"] = float(score)
+
+        synchronous = not self.config.mlflow_async
+        try:
+            with mlflow.start_run() as run:
+                operations = [
+                    mlflow.log_params(self.config.all_params, synchronous=synchronous),
+                    mlflow.log_metrics(metrics, synchronous=synchronous)
+                ]
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    for path in (self.config.model_bundle_path,
+                                 self.config.feature_encoder_path):
+                        if Path(path).exists():
+                            shutil.copy2(path, tmp_dir)
+                    mlflow.log_artifacts(tmp_dir, "model")
+                for operation in operations:
+                    if operation is not None:
+                        operation.wait()
+            logger.info("Logged model bundle to MLflow run {}", run.info.run_id)
+        except Exception as e:
+            if synchronous:
+                raise
+            logger.exception(e)
+            self.logging_error = e
+
+    def wait_for_mlflow(self) -> None:
+        """
+        Block until background logging to MLflow has finished.
+
+        :raises Exception: the error raised while logging in the background
+        """
+
+        if self.logging_thread is not None:
+            self.logging_thread.join()
+            self.logging_thread = None
+        if self.logging_error is not None:
+            raise self.logging_error
+
+    def _log_statsmodels_models(self):
         mlflow.set_registry_uri(self.config.mlflow_uri)
         tracking_url_type_store = urlparse(mlflow.get_tracking_uri()).scheme
 
@@ -77,14 +168,17 @@ class Evaluation:
             mlflow.log_metrics(
                 {"pinball score": self.score}
             )
+            if Path(self.config.feature_encoder_path).exists():
+                mlflow.log_artifact(self.config.feature_encoder_path, "model")
+            models = load_models(self.config.path_to_models)
             if tracking_url_type_store != "file":
-                for i, model in enumerate(self.models):
+                for i, model in enumerate(models):
                     mlflow.statsmodels.log_model(
                         model, "model", registered_model_name=f"q{(i + 1) * 10}",
                         input_example=self.sample_data, signature=False  # type: ignore
                     )
             else:
-                for _, model in enumerate(self.models):
+                for _, model in enumerate(models):
                     mlflow.statsmodels.log_model(
                         model, "model", input_example=self.sample_data,
                         signature=False  # type: ignore
@@ -1,13 +1,40 @@
 """Model trainig component."""
 
+from concurrent.futures import ProcessPoolExecutor
+import json
 import os
 from pathlib import Path
+import shutil
+import tempfile
+import time
 
 from loguru import logger
-import pandas as pd
-import statsmodels.formula.api as smf
+import numpy as np
+from statsmodels.regression.linear_model import RegressionResultsWrapper
+from statsmodels.regression.quantile_regression import QuantRegResults
 
-from dopro2_HEFTcom_challenge.entity import TrainingConfig
+from dopro2_HEFTcom_challenge.entity import QuantileModelBundle, TrainingConfig
+from dopro2_HEFTcom_challenge.utils import WarmStartQuantReg, read_parquet_projected
+
+
+def _fit_quantile(
+    endog_path: Path,
+    exog_path: Path,
+    q: float,
+    max_iter: int
+) -> tuple[QuantRegResults, float]:
+    """
+    Fit one quantile on the memory mapped design matrix.
+    The model is removed from the result before it is sent back,
+    the caller attaches the formula model again.
+    """
+
+    start = time.perf_counter()
+    endog = np.load(endog_path, mmap_mode="r")
+    exog = np.load(exog_path, mmap_mode="r")
+    results = WarmStartQuantReg(endog, exog).fit(q=q, max_iter=max_iter)._results
+    results.model = None
+    return results, time.perf_counter() - start
 
 
 class Training:
@@ -21,32 +48,173 @@ class Training:
         """
 
         self.config = config
+        self.fit_report: dict[str, dict] = {}
 
     @staticmethod
     def save_models(forecast_models: dict, path: Path) -> None:
         os.makedirs(path, exist_ok=True)
         logger.info("created directory at: {}", path)
 
-        for quantile in range(10, 100, 10):
-            forecast_models[f"q{quantile}"].save(f"{path}/model_q{quantile}.pickle")
+        for name, forecast_model in forecast_models.items():
+            forecast_model.save(f"{path}/model_{name}.pickle")
         logger.info("saved all models in at {}", path)
 
     def train(self) -> None:
         logger.info("Loading trainind data from {}", self.config.training_data_path)
-        training_data = pd.read_parquet(self.config.training_data_path)
-        model = smf.quantreg(
-            formula="total_generation_MWh ~ bs(SolarDownwardRadiation,df=5) \
-                + bs(WindSpeed,df=8)",
-            data=training_data
+        training_data = read_parquet_projected(
+            self.config.training_data_path,
+            columns=self.config.columns,
+            start=self.config.reference_time_start,
+            end=self.config.reference_time_end
         )
 
         logger.info("Start model training")
-        forecast_models = {}
-        for quantile in range(10, 100, 10):
-            forecast_models[f"q{quantile}"] = model.fit(q=quantile / 100, max_iter=2500)
-            training_data[f"q{quantile}"] = forecast_models[f"q{quantile}"]\
-                .predict(training_data)
-            training_data.loc[training_data[f"q{quantile}"] < 0, f"q{quantile}"] = 0
+        # without start_params the fit is the one of QuantReg, the results
+        # also tell whether the IRLS loop converged
+        model = WarmStartQuantReg.from_formula(self.config.formula, training_data)
+        if self.config.warm_start:
+            if self.config.n_workers > 1:
+                logger.warning("warm_start fits the quantiles one after another, "
+                               "n_workers={} is ignored", self.config.n_workers)
+            forecast_models = self._fit_warm_start(model)
+        elif self.config.n_workers > 1:
+            forecast_models = self._fit_parallel(model)
+        else:
+            forecast_models = {}
+            for quantile in self.config.quantiles:
+                start = time.perf_counter()
+                forecast_models[f"q{quantile}"] = model.fit(
+                    q=quantile / 100, max_iter=self.config.max_iter
+                )
+                self._report_fit(f"q{quantile}", time.perf_counter() - start,
+                                 forecast_models[f"q{quantile}"])
         logger.info("Model trained")
 
         self.save_models(forecast_models, self.config.trained_models_path)
+        bundle = QuantileModelBundle.from_results(forecast_models)
+        bundle.nwp_sources = self.trained_nwp_sources(bundle.variables)
+        bundle.save(self.config.model_bundle_path)
+        self.save_feature_encoder()
+        with open(f"{self.config.root_dir}/fit_report.json", "w",
+                  encoding="utf-8") as f:
+            json.dump(self.fit_report, f, indent=2)
+
+    def _report_fit(self, name: str, seconds: float, results) -> None:
+        converged = bool(results.converged)
+        self.fit_report[name] = {
+            "seconds": round(seconds, 3),
+            "iterations": int(results.iterations),
+            "converged": converged
+        }
+        logger.info("Fitted {} in {:.2f}s ({} iterations, converged: {})",
+                    name, seconds, results.iterations, converged)
+
+    def trained_nwp_sources(self, variables: list[str]) -> list[dict]:
+        """
+        NWP models whose forecasts the formula uses, so the prediction
+        only fetches these. The primary model is always included.
+
+        :param variables: data columns of the formula
+        :return: NWP models from nwp_sources, the primary model first
+        :rtype: list[dict]
+        """
+
+        primary, *further = self.config.nwp_sources
+        return [primary, *(source for source in further
+                           if any(v.endswith(source["suffix"]) for v in variables))]
+
+    @staticmethod
+    def warm_start_order(quantiles: list[int]) -> list[tuple[int, int | None]]:
+        """
+        Order in which the quantiles are fitted with warm starts.
+
+        The quantile closest to the median is fitted first from scratch,
+        then the fits move outwards on both sides, each one seeded with
+        the solution of its inner neighbour.
+
+        :param quantiles: quantiles in percent
+        :return: pairs of (quantile, quantile whose solution seeds the fit)
+        :rtype: list[tuple[int, int | None]]
+        """
+
+        ordered = sorted(quantiles)
+        center = min(range(len(ordered)), key=lambda i: abs(ordered[i] - 50))
+        order = [(ordered[center], None)]
+        for i in range(center + 1, len(ordered)):
+            order.append((ordered[i], ordered[i - 1]))
+        for i in range(center - 1, -1, -1):
+            order.append((ordered[i], ordered[i + 1]))
+        return order
+
+    def _fit_warm_start(self, model: WarmStartQuantReg) -> dict:
+        """
+        Fit all quantiles in warm start order, see warm_start_order.
+
+        :param model: warm-startable quantile regression built from the formula
+        :return: fitted models per quantile, sorted by quantile
+        :rtype: dict
+        """
+
+        fitted = {}
+        for quantile, seed in self.warm_start_order(self.config.quantiles):
+            start_params = None if seed is None else fitted[seed].params.to_numpy()
+            start = time.perf_counter()
+            fitted[quantile] = model.fit(q=quantile / 100,
+                                         max_iter=self.config.max_iter,
+                                         start_params=start_params)
+            self._report_fit(f"q{quantile}", time.perf_counter() - start,
+                             fitted[quantile])
+
+        return {f"q{quantile}": fitted[quantile] for quantile in sorted(fitted)}
+
+    def _fit_parallel(self, model: WarmStartQuantReg) -> dict:
+        """
+        Fit all quantiles in a process pool.
+
+        The design matrix is built once by the formula model and shared
+        with the workers as memory mapped .npy files. The fitted results
+        get the formula model attached again, so they are the same as the
+        results of the serial path.
+
+        :param model: quantile regression model built from the formula
+        :return: fitted models per quantile
+        :rtype: dict
+        """
+
+        forecast_models = {}
+        with tempfile.TemporaryDirectory(dir=self.config.root_dir) as tmp_dir:
+            endog_path = Path(tmp_dir) / "endog.npy"
+            exog_path = Path(tmp_dir) / "exog.npy"
+            np.save(endog_path, model.endog)
+            np.save(exog_path, model.exog)
+
+            logger.info("Fitting {} quantiles with {} workers",
+                        len(self.config.quantiles), self.config.n_workers)
+            with ProcessPoolExecutor(max_workers=self.config.n_workers) as executor:
+                futures = {
+                    quantile: executor.submit(_fit_quantile, endog_path, exog_path,
+                                              quantile / 100, self.config.max_iter)
+                    for quantile in self.config.quantiles
+                }
+                for quantile, future in futures.items():
+                    results, seconds = future.result()
+                    results.model = model
+                    forecast_models[f"q{quantile}"] = RegressionResultsWrapper(results)
+                    self._report_fit(f"q{quantile}", seconds, results)
+
+        # state that QuantReg.fit sets on the model in the serial path
+        model.rank = np.linalg.matrix_rank(model.exog)
+        model.df_model = float(model.rank - model.k_constant)
+        model.df_resid = model.nobs - model.rank
+
+        return forecast_models
+
+    def save_feature_encoder(self) -> None:
+        """Store the feature encoder of the training data next to the models."""
+
+        encoder_path = Path(self.config.feature_encoder_path)
+        if not encoder_path.exists():
+            logger.warning("No feature encoder found at {}", encoder_path)
+            return
+        shutil.copy2(encoder_path, Path(self.config.trained_models_path))
+        logger.info("saved feature encoder at {}", self.config.trained_models_path)
@@ -11,9 +11,13 @@ from dopro2_HEFTcom_challenge.constants import (
     CONFIG_FILE_PATH
 )
 from dopro2_HEFTcom_challenge.entity import (
+    BacktestConfig,
     DataIngestionConfig,
     DataPreparationConfig,
     EvaluationConfig,
+    OrchestrationConfig,
+    PredictionConfig,
+    ResponseCacheConfig,
     TrainingConfig
 )
 
@@ -79,7 +83,22 @@ class ConfigurationManager:
             weather_data_path=config["weather_data_path"],
             energy_data_path=config["energy_data_path"],
             training_data_path=config["training_data_path"],
-            test_data_path=config["test_data_path"]
+            test_data_path=config["test_data_path"],
+            n_workers=config["n_workers"],
+            incremental=config["incremental"],
+            manifest_path=config["manifest_path"],
+            feature_encoder_path=config["feature_encoder_path"],
+            dtype_policy=config["dtype_policy"],
+            checkpoints=config["checkpoints"],
+            async_checkpoints=config["async_checkpoints"],
+            n_writers=config["n_writers"],
+            test_start=config["test_start"],
+            test_end=config["test_end"],
+            spatial_reducers=config["spatial_reducers"],
+            nwp_sources=config["nwp_sources"],
+            nwp_max_run_age=config["nwp_max_run_age"],
+            model_data_path=config["model_data_path"],
+            model_data_max_hours_after=config["model_data_max_hours_after"]
         )
 
         return data_preparation_config
@@ -92,7 +111,7 @@ class ConfigurationManager:
         :rtype: TrainingConfig
         """
         config = self.config["training"]
-        # params = self.params
+        params = self.params["quantile_regression"]
 
         os.makedirs(config["root_dir"], exist_ok=True)
         logger.info("created directory at: {}", config["root_dir"])
@@ -100,7 +119,19 @@ class ConfigurationManager:
         training_config = TrainingConfig(
             root_dir=config["root_dir"],
             trained_models_path=config["trained_models_path"],
-            training_data_path=config["training_data_path"]
+            training_data_path=config["training_data_path"],
+            feature_encoder_path=config["feature_encoder_path"],
+            model_bundle_path=config["model_bundle_path"],
+            formula=params["formula"],
+            columns=params["columns"],
+            quantiles=params["quantiles"],
+            max_iter=params["max_iter"],
+            reference_time_start=config["reference_time_start"],
+            reference_time_end=config["reference_time_end"],
+            n_workers=config["n_workers"],
+            warm_start=config["warm_start"],
+            # the bundle stores the NWP models the formula uses
+            nwp_sources=self.config["data_preparation"]["nwp_sources"]
         )
 
         return training_config
@@ -115,11 +146,123 @@ class ConfigurationManager:
 
         config = self.config["evaluation"]
 
+        os.makedirs(config["root_dir"], exist_ok=True)
+        logger.info("created directory at: {}", config["root_dir"])
+
         evaluation_config = EvaluationConfig(
+            root_dir=config["root_dir"],
             path_to_models=config["path_to_models"],
             training_data_path=config["training_data_path"],
             all_params=self.params,
-            mlflow_uri=config["mlflow_uri"]
+            feature_encoder_path=config["feature_encoder_path"],
+            model_bundle_path=config["model_bundle_path"],
+            breakdown_columns=config["breakdown_columns"],
+            reference_time_start=config["reference_time_start"],
+            reference_time_end=config["reference_time_end"],
+            mlflow_uri=config["mlflow_uri"],
+            mlflow_log_mode=config["mlflow_log_mode"],
+            mlflow_async=config["mlflow_async"]
         )
 
         return evaluation_config
+
+    def get_prediction_config(self) -> PredictionConfig:
+        """
+        Get all config params for the prediction.
+
+        :return: values from config.yaml
+        :rtype: PredictionConfig
+        """
+
+        config = self.config["prediction"]
+
+        prediction_config = PredictionConfig(
+            path_to_models=config["path_to_models"],
+            feature_encoder_path=config["feature_encoder_path"],
+            model_bundle_path=config["model_bundle_path"],
+            api_base_url=config["api_base_url"],
+            api_max_workers=config["api_max_workers"],
+            api_retries=config["api_retries"],
+            api_backoff_factor=config["api_backoff_factor"],
+            api_timeout=config["api_timeout"],
+            api_stream_json=config["api_stream_json"],
+            # the forecasts need the same features as the training data
+            spatial_reducers=self.config["data_preparation"]["spatial_reducers"],
+            nwp_sources=self.config["data_preparation"]["nwp_sources"]
+        )
+
+        return prediction_config
+
+    def get_response_cache_config(self) -> ResponseCacheConfig:
+        """
+        Get all config params of the Rebase API response cache.
+
+        :return: values from config.yaml
+        :rtype: ResponseCacheConfig
+        """
+
+        config = self.config["response_cache"]
+
+        response_cache_config = ResponseCacheConfig(
+            enabled=config["enabled"],
+            root_dir=config["root_dir"],
+            ttl_seconds=config["ttl_seconds"],
+            max_size_mb=config["max_size_mb"],
+            offline=config["offline"],
+            nwp_run_interval=config["nwp_run_interval"],
+            nwp_publication_delay=config["nwp_publication_delay"]
+        )
+
+        return response_cache_config
+
+    def get_backtest_config(self) -> BacktestConfig:
+        """
+        Get all config params and create folder in artifacts dir.
+
+        :return: values from config.yaml and params.yaml
+        :rtype: BacktestConfig
+        """
+
+        config = self.config["backtest"]
+        params = self.params["quantile_regression"]
+
+        os.makedirs(config["root_dir"], exist_ok=True)
+        logger.info("created directory at: {}", config["root_dir"])
+
+        backtest_config = BacktestConfig(
+            root_dir=config["root_dir"],
+            data_path=config["data_path"],
+            results_path=config["results_path"],
+            window=config["window"],
+            train_length=config["train_length"],
+            test_length=config["test_length"],
+            step=config["step"],
+            reference_time_start=config["reference_time_start"],
+            reference_time_end=config["reference_time_end"],
+            n_workers=config["n_workers"],
+            warm_start=config["warm_start"],
+            formula=params["formula"],
+            columns=params["columns"],
+            quantiles=params["quantiles"],
+            max_iter=params["max_iter"]
+        )
+
+        return backtest_config
+
+    def get_orchestration_config(self) -> OrchestrationConfig:
+        """
+        Get all config params of the stage orchestration.
+
+        :return: values from config.yaml
+        :rtype: OrchestrationConfig
+        """
+
+        config = self.config["orchestration"]
+
+        orchestration_config = OrchestrationConfig(
+            state_path=config["state_path"],
+            report_path=config["report_path"],
+            memory_sample_interval=config["memory_sample_interval"]
+        )
+
+        return orchestration_config
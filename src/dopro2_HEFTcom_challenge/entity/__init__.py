@@ -1,18 +1,57 @@
 """Module for all entities."""
 
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Final
+
 from dopro2_HEFTcom_challenge.entity.config_entity import (
+    BacktestConfig,
     DataIngestionConfig,
     DataPreparationConfig,
     EvaluationConfig,
+    OrchestrationConfig,
+    PredictionConfig,
+    ResponseCacheConfig,
     TrainingConfig
 )
-from dopro2_HEFTcom_challenge.entity.rebase_api import RebaseAPI
+from dopro2_HEFTcom_challenge.entity.file_manifest import FileManifest
+
+if TYPE_CHECKING:
+    from dopro2_HEFTcom_challenge.entity.quantile_model_bundle import \
+        QuantileModelBundle
+    from dopro2_HEFTcom_challenge.entity.rebase_api import RebaseAPI
+    from dopro2_HEFTcom_challenge.entity.response_cache import ResponseCache
 
 
 __all__: list[str] = [
+    "BacktestConfig",
     "DataIngestionConfig",
     "DataPreparationConfig",
     "EvaluationConfig",
+    "FileManifest",
+    "OrchestrationConfig",
+    "PredictionConfig",
+    "QuantileModelBundle",
+    "ResponseCacheConfig",
     "TrainingConfig",
-    "RebaseAPI"
+    "RebaseAPI",
+    "ResponseCache"
 ]
+
+# entities with heavy dependencies (patsy, requests) are imported on first use
+_LAZY_IMPORTS: Final = {
+    "QuantileModelBundle": "dopro2_HEFTcom_challenge.entity.quantile_model_bundle",
+    "RebaseAPI": "dopro2_HEFTcom_challenge.entity.rebase_api",
+    "ResponseCache": "dopro2_HEFTcom_challenge.entity.response_cache"
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -34,6 +34,51 @@ class DataPreparationConfig:
     test_data_path: Path
     """Directory into which test data will be loaded."""
 
+    n_workers: int
+    """Number of processes for weather file ingestion (1 = serial)."""
+
+    incremental: bool
+    """Only process new or changed source files."""
+
+    manifest_path: Path
+    """JSON file with the already processed source files."""
+
+    feature_encoder_path: Path
+    """File into which the fitted categorical feature encoder will be saved."""
+
+    dtype_policy: dict
+    """Column dtypes and compression codec for the written parquet files."""
+
+    checkpoints: list[str] | None
+    """Names of the intermediate results written to parquet (None = all)."""
+
+    async_checkpoints: bool
+    """Write the checkpoints on background threads."""
+
+    n_writers: int
+    """Number of threads writing checkpoints in parallel."""
+
+    test_start: str
+    """First reference time of the test split."""
+
+    test_end: str
+    """Reference time the test split ends before."""
+
+    spatial_reducers: dict[str, list[dict]]
+    """Spatial reducers per weather data type (hornsea, solar)."""
+
+    nwp_sources: list[dict]
+    """NWP models with file prefix, API model and column suffix, first is primary."""
+
+    nwp_max_run_age: str | None
+    """Maximum time between a primary run and the aligned run of a further model."""
+
+    model_data_path: Path
+    """File with the features and the total generation the models are trained on."""
+
+    model_data_max_hours_after: float
+    """Forecasts with this lead time in hours or more are not in the model data."""
+
 
 @dataclass(frozen=True)
 class TrainingConfig:
@@ -48,11 +93,47 @@ class TrainingConfig:
     training_data_path: Path
     """Directory where training data is stored."""
 
+    feature_encoder_path: Path
+    """Fitted feature encoder, stored together with the trained models."""
+
+    model_bundle_path: Path
+    """File in which the coefficients and knots of all models are bundled."""
+
+    formula: str
+    """Formula of the quantile regression."""
+
+    columns: list[str]
+    """Columns of the training data used by the formula."""
+
+    quantiles: list[int]
+    """Quantiles (in percent) for which a model is trained."""
+
+    max_iter: int
+    """Maximum number of iterations per model fit."""
+
+    reference_time_start: str | None
+    """First reference time of the training data (None = no limit)."""
+
+    reference_time_end: str | None
+    """End of the reference times of the training data, exclusive."""
+
+    n_workers: int
+    """Number of processes that fit the quantiles (1 = serial)."""
+
+    warm_start: bool
+    """Fit the quantiles from the median outwards, each seeded with its neighbour."""
+
+    nwp_sources: list[dict]
+    """NWP models of the training data, the primary model first."""
+
 
 @dataclass(frozen=True)
 class EvaluationConfig:
     """Entity-Class for data evaluation config params."""
 
+    root_dir: Path
+    """Directory into which the score breakdown is written."""
+
     path_to_models: Path
     """Directory in which models are stored."""
 
@@ -62,5 +143,154 @@ class EvaluationConfig:
     all_params: dict
     """Model parameters."""
 
+    feature_encoder_path: Path
+    """Feature encoder that belongs to the models."""
+
+    model_bundle_path: Path
+    """Bundle of all quantile models."""
+
+    breakdown_columns: list[str]
+    """Columns by which the pinball score is broken down, e.g. hours_after."""
+
+    reference_time_start: str | None
+    """First reference time of the test data (None = no limit)."""
+
+    reference_time_end: str | None
+    """End of the reference times of the test data, exclusive."""
+
     mlflow_uri: str
     """URL to MLFlow dashboard."""
+
+    mlflow_log_mode: str
+    """"bundle" logs the model bundle, "statsmodels" every model pickle."""
+
+    mlflow_async: bool
+    """Log to MLflow in the background without blocking the pipeline."""
+
+
+@dataclass(frozen=True)
+class PredictionConfig:
+    """Entity-Class for prediction config params."""
+
+    path_to_models: Path
+    """Directory in which models are stored."""
+
+    feature_encoder_path: Path
+    """Feature encoder that belongs to the models."""
+
+    model_bundle_path: Path
+    """Bundle of all quantile models."""
+
+    api_base_url: str
+    """URL of the Rebase API."""
+
+    api_max_workers: int
+    """Number of weather queries sent at once (1 = one after the other)."""
+
+    api_retries: int
+    """Maximum number of retries of a failed request."""
+
+    api_backoff_factor: float
+    """The n-th retry waits api_backoff_factor * 2**(n-1) seconds."""
+
+    api_timeout: float
+    """Seconds to wait for a response."""
+
+    api_stream_json: bool
+    """Parse point responses while they are downloaded."""
+
+    spatial_reducers: dict[str, list[dict]]
+    """Spatial reducers per weather data type, the same as in the training data."""
+
+    nwp_sources: list[dict]
+    """NWP models whose forecasts are fetched if the model bundle does not list them."""
+
+
+@dataclass(frozen=True)
+class ResponseCacheConfig:
+    """Entity-Class for the Rebase API response cache config params."""
+
+    enabled: bool
+    """Cache the challenge data and weather responses."""
+
+    root_dir: Path
+    """Directory of the cached responses."""
+
+    ttl_seconds: float
+    """Seconds a cached response is served."""
+
+    max_size_mb: float
+    """Maximum size of the cache, least recently used responses are removed."""
+
+    offline: bool
+    """Serve only from the cache, never request the API."""
+
+    nwp_run_interval: str
+    """Time between two NWP runs."""
+
+    nwp_publication_delay: str
+    """Time after which a NWP run is available from the API."""
+
+
+@dataclass(frozen=True)
+class BacktestConfig:
+    """Entity-Class for rolling-origin backtest config params."""
+
+    root_dir: Path
+    """Directory for the backtest results and the cached design matrices."""
+
+    data_path: Path
+    """Prepared model data with reference_time."""
+
+    results_path: Path
+    """Parquet file with the pinball scores per fold."""
+
+    window: str
+    """"expanding" keeps the first training day, "sliding" moves it along."""
+
+    train_length: str
+    """Length of the first (expanding) or every (sliding) training window."""
+
+    test_length: str
+    """Length of the scored period after each training window."""
+
+    step: str
+    """Offset between the origins of two folds."""
+
+    reference_time_start: str | None
+    """First reference time of the backtest (None = no limit)."""
+
+    reference_time_end: str | None
+    """End of the reference times of the backtest, exclusive."""
+
+    n_workers: int
+    """Number of processes that run the folds (1 = serial)."""
+
+    warm_start: bool
+    """Seed each quantile fit with the solution of its neighbour."""
+
+    formula: str
+    """Formula of the quantile regression."""
+
+    columns: list[str]
+    """Columns of the data used by the formula."""
+
+    quantiles: list[int]
+    """Quantiles (in percent) for which a model is fitted."""
+
+    max_iter: int
+    """Maximum number of iterations per model fit."""
+
+
+@dataclass(frozen=True)
+class OrchestrationConfig:
+    """Entity-Class for the stage orchestration config params."""
+
+    state_path: Path
+    """JSON file with the input and output fingerprints of the last stage runs."""
+
+    report_path: Path
+    """JSON file with time, cache hit and peak memory of every stage."""
+
+    memory_sample_interval: float
+    """Seconds between two samples of the resident memory."""
@@ -0,0 +1,128 @@
+"""Manifest of already processed source files."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from loguru import logger
+
+
+class FileManifest:
+    """
+    Keeps track of processed source files by path, size, mtime and hash,
+    so only new or changed files have to be processed again.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """
+        Constructor for FileManifest class.
+
+        :param path: JSON file in which the manifest is stored
+        """
+
+        self.path = Path(path)
+        self.entries: dict[str, dict] = {}
+        self._hashes: dict[str, str] = {}
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def file_hash(self, file: Path, chunk_size: int = 1 << 20) -> str:
+        """
+        Calculate the sha256 hash of a file in chunks.
+        Hashes are cached for the lifetime of the manifest object.
+
+        :param file: file to hash
+        :param chunk_size: number of bytes read at once
+        :return: hex digest of the file content
+        :rtype: str
+        """
+
+        if str(file) not in self._hashes:
+            sha = hashlib.sha256()
+            with Path(file).open("rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    sha.update(chunk)
+            self._hashes[str(file)] = sha.hexdigest()
+        return self._hashes[str(file)]
+
+    def is_changed(self, file: Path) -> bool:
+        """
+        Check if a file is new or has changed since it was processed.
+        The hash is only calculated if size or mtime differ.
+
+        :param file: source file
+        :return: True, if the file has to be processed
+        :rtype: bool
+        """
+
+        entry = self.entries.get(str(file))
+        if entry is None:
+            return True
+
+        stat = os.stat(file)
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return False
+        if entry["size"] == stat.st_size and entry["sha256"] == self.file_hash(file):
+            entry["mtime"] = stat.st_mtime
+            return False
+        return True
+
+    def changed_files(self, files: list[Path]) -> list[Path]:
+        """
+        Filter the files that are new or have changed.
+
+        :param files: source files
+        :return: files that have to be processed
+        :rtype: list[Path]
+        """
+
+        return [f for f in files if self.is_changed(f)]
+
+    def removed_files(self, files: list[Path], pattern: str) -> list[Path]:
+        """
+        Files in the manifest that match ``pattern`` but do not exist anymore.
+
+        :param files: current source files
+        :param pattern: glob pattern of the source files, e.g. "*.csv"
+        :return: files that were removed since the last run
+        :rtype: list[Path]
+        """
+
+        current = {str(f) for f in files}
+        return [
+            Path(f) for f in self.entries
+            if f not in current and Path(f).match(pattern)
+        ]
+
+    def update(self, file: Path) -> None:
+        """
+        Record the current state of a processed file.
+
+        :param file: source file
+        """
+
+        stat = os.stat(file)
+        self.entries[str(file)] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": self.file_hash(file)
+        }
+
+    def remove(self, file: Path) -> None:
+        """
+        Remove a file from the manifest.
+
+        :param file: source file
+        """
+
+        self.entries.pop(str(file), None)
+
+    def save(self) -> None:
+        """Write the manifest to disk."""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        logger.info("Saved manifest with {} files at {}", len(self.entries), self.path)
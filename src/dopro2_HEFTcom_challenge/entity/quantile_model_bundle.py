@@ -0,0 +1,223 @@
+"""Compact artifact of all quantile regression models."""
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+from patsy import DesignInfo, bs
+from patsy.eval import ast_names
+from patsy.splines import BS
+
+if TYPE_CHECKING:
+    from statsmodels.base.model import Results
+
+
+class QuantileModelBundle:
+    """
+    Coefficients, spline knots and quantile levels of a set of quantile
+    regression models that share one formula.
+
+    Only formulas made of an intercept, plain numeric variables and
+    ``bs()`` splines are supported. Spline inputs outside of the knots
+    of the training data are clipped to the outermost knots.
+    """
+
+    def __init__(self, quantiles: list[int], terms: list[dict],
+                 coefficients: np.ndarray,
+                 nwp_sources: list[dict] | None = None) -> None:
+        """
+        Constructor for QuantileModelBundle class.
+
+        :param quantiles: quantile levels in percent, in increasing order
+        :param terms: term specs in column order of the design matrix
+        :param coefficients: coefficients with one column per quantile
+        :param nwp_sources: NWP models the models were trained on, the
+            primary model first, None if unknown
+        """
+
+        if list(quantiles) != sorted(quantiles):
+            raise ValueError("quantiles have to be in increasing order")
+        self.quantiles = [int(q) for q in quantiles]
+        self.terms = terms
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.nwp_sources = nwp_sources
+
+    @property
+    def columns(self) -> list[str]:
+        """Names of the prediction columns, e.g. q10."""
+
+        return [f"q{q}" for q in self.quantiles]
+
+    @property
+    def variables(self) -> list[str]:
+        """Data columns the design matrix is built from."""
+
+        return list(dict.fromkeys(t["column"] for t in self.terms if "column" in t))
+
+    @classmethod
+    def from_results(cls, models: dict[str, "Results"]) -> "QuantileModelBundle":
+        """
+        Create the bundle from fitted formula models.
+
+        :param models: fitted models by name, e.g. {"q10": ..., "q20": ...}
+        :return: bundle of all models
+        :rtype: QuantileModelBundle
+        """
+
+        quantiles = sorted(int(round(model.q * 100)) for model in models.values())
+        by_quantile = {int(round(model.q * 100)): model for model in models.values()}
+        design_info = by_quantile[quantiles[0]].model.data.design_info
+        coefficients = np.column_stack(
+            [np.asarray(by_quantile[q].params) for q in quantiles]
+        )
+        return cls(quantiles, cls.formula_terms(design_info), coefficients)
+
+    @staticmethod
+    def formula_terms(design_info: DesignInfo) -> list[dict]:
+        """
+        Term specs of a fitted formula, including the spline knots.
+
+        :param design_info: patsy design info of the fitted formula
+        :return: term specs in column order of the design matrix
+        :rtype: list[dict]
+        :raises ValueError: if the formula has an unsupported term
+        """
+
+        terms = []
+        for term in design_info.terms:
+            term_slice = design_info.term_slices[term]
+            width = term_slice.stop - term_slice.start
+            if not term.factors:
+                terms.append({"type": "intercept"})
+                continue
+
+            if len(term.factors) != 1:
+                break
+            factor_info = design_info.factor_infos[term.factors[0]]
+            code = factor_info.factor.code
+            names = [n for n in ast_names(code) if n != "bs"]
+            transforms = list(factor_info.state["transforms"].values())
+            if not transforms and code.isidentifier():
+                if factor_info.type != "numerical" or width != 1:
+                    break
+                terms.append({"type": "linear", "column": code})
+            elif (len(names) == 1 and len(transforms) == 1
+                  and isinstance(transforms[0], BS)):
+                all_knots = transforms[0]._all_knots
+                degree = transforms[0]._degree
+                terms.append({
+                    "type": "bs",
+                    "column": names[0],
+                    "degree": int(degree),
+                    "knots": all_knots[degree + 1:-(degree + 1)].tolist(),
+                    "lower_bound": float(all_knots[0]),
+                    "upper_bound": float(all_knots[-1]),
+                    "include_intercept": width == len(all_knots) - degree - 1
+                })
+            else:
+                break
+        else:
+            return terms
+        raise ValueError(f"Unsupported formula term: {term.name()}")
+
+    def design_matrix(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Design matrix of ``data``, missing values give rows of NaN.
+
+        :param data: data frame with the variables of the formula
+        :return: design matrix with one row per row of ``data``
+        :rtype: np.ndarray
+        """
+
+        blocks = []
+        for term in self.terms:
+            if term["type"] == "intercept":
+                blocks.append(np.ones((len(data), 1)))
+                continue
+
+            x = data[term["column"]].to_numpy(dtype=np.float64)
+            if term["type"] == "linear":
+                blocks.append(x[:, None])
+                continue
+
+            missing = np.isnan(x)
+            x = np.clip(x, term["lower_bound"], term["upper_bound"])
+            x[missing] = term["lower_bound"]
+            basis = bs(x, knots=term["knots"], degree=term["degree"],
+                       include_intercept=term["include_intercept"],
+                       lower_bound=term["lower_bound"],
+                       upper_bound=term["upper_bound"])
+            basis[missing] = np.nan
+            blocks.append(basis)
+        return np.hstack(blocks)
+
+    def predict(
+        self,
+        data: pd.DataFrame,
+        sort: bool = True,
+        out: np.ndarray | None = None,
+        chunk_size: int = 100_000
+    ) -> np.ndarray:
+        """
+        Predict all quantiles in one matrix multiply.
+
+        Crossing quantiles are rearranged by sorting each row, which
+        never increases the pinball loss. The design matrix is built for
+        ``chunk_size`` rows at a time, so only the output has the full
+        length of ``data``.
+
+        :param data: data frame with the variables of the formula
+        :param sort: sort the quantiles of each row
+        :param out: array of shape (len(data), number of quantiles) the
+            predictions are written into
+        :param chunk_size: number of rows predicted at once
+        :return: predictions with one column per quantile
+        :rtype: np.ndarray
+        """
+
+        if out is None:
+            out = np.empty((len(data), len(self.quantiles)))
+        for start in range(0, len(data), chunk_size):
+            stop = min(start + chunk_size, len(data))
+            np.matmul(self.design_matrix(data.iloc[start:stop]), self.coefficients,
+                      out=out[start:stop])
+        if sort:
+            out.sort(axis=1)
+        return out
+
+    def save(self, path: Path) -> None:
+        """
+        Store the bundle as a .npz file.
+
+        :param path: target file
+        """
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        arrays = {"quantiles": np.asarray(self.quantiles),
+                  "coefficients": self.coefficients,
+                  "terms": np.asarray(json.dumps(self.terms))}
+        if self.nwp_sources is not None:
+            arrays["nwp_sources"] = np.asarray(json.dumps(self.nwp_sources))
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+        logger.info("saved quantile model bundle at {}", path)
+
+    @classmethod
+    def load(cls, path: Path) -> "QuantileModelBundle":
+        """
+        Load a bundle stored with save.
+
+        :param path: .npz file
+        :return: bundle of all models
+        :rtype: QuantileModelBundle
+        """
+
+        with np.load(path, allow_pickle=False) as npz:
+            # bundles saved before the NWP models were stored do not have them
+            nwp_sources = (json.loads(str(npz["nwp_sources"]))
+                           if "nwp_sources" in npz.files else None)
+            return cls(npz["quantiles"].tolist(), json.loads(str(npz["terms"])),
+                       npz["coefficients"], nwp_sources)
@@ -2,20 +2,83 @@
 
 """Rebase-API-Klasse."""
 
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain
+import json
 import os
-from typing import Literal
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Literal
 
 from loguru import logger
+import numpy as np
 import pandas as pd
-import requests
-from requests import Session
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from dopro2_HEFTcom_challenge.entity.response_cache import ResponseCache
 from dopro2_HEFTcom_challenge.utils import (
+    add_calendar_features,
+    align_nwp_models,
     day_ahead_market_times,
+    encode_categorical_features,
     load_weather_data,
+    merge_weather_data,
     weather_df_to_xr
 )
 
+if TYPE_CHECKING:
+    from sklearn.preprocessing import OneHotEncoder
+
+
+def _iter_json_array(chunks: Iterable[bytes]) -> Iterator:
+    """
+    Parse the elements of a top-level JSON array while it is downloaded.
+
+    Only the text of the element that is parsed is kept in memory.
+
+    :param chunks: UTF-8 encoded parts of the JSON text
+    :return: elements of the array
+    :rtype: Iterator
+    """
+
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    position = 0
+    started = exhausted = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("The response is not a JSON array")
+                position += 1
+                started = True
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                end = None
+            # a number at the end of the buffer may continue in the next chunk
+            if end is not None and (end < len(buffer) or exhausted):
+                yield element
+                position = end
+                continue
+        if exhausted:
+            raise ValueError("The JSON array is incomplete")
+        chunk = next(chunks, None)
+        exhausted = chunk is None
+        # drop the parsed text before appending the next chunk
+        buffer = buffer[position:] + utf8.decode(chunk or b"", final=exhausted)
+        position = 0
+
 
 class RebaseAPI:
     """Rebase-API-Klasse zum abrufen und abgeben der Daten."""
@@ -25,15 +88,177 @@ class RebaseAPI:
 
     def __init__(
         self,
-        api_key=None
+        api_key=None,
+        base_url: str | None = None,
+        max_workers: int = 4,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 180,
+        cache: ResponseCache | None = None,
+        stream_json: bool = False
     ):
+        """
+        Constructor for RebaseAPI class.
+
+        All requests go through one session with a connection pool of
+        ``max_workers`` connections per host. Failed connections and
+        responses with status 429 or 5xx are retried ``retries`` times
+        with exponential backoff, including the POST weather queries, which
+        only read data. Submissions are sent through a session without
+        retries, so a bid is never submitted twice. The latency of every
+        request is recorded in ``latencies``.
+
+        :param api_key: API key, default is the REBASE_API_KEY variable
+        :param base_url: URL of the API, e.g. of a local stub server
+        :param max_workers: number of weather queries sent at once
+            (1 = one after the other)
+        :param retries: maximum number of retries per request
+        :param backoff_factor: the n-th retry waits backoff_factor * 2**(n-1) s
+        :param timeout: seconds to wait for a response
+        :param cache: cache of the challenge data and weather responses
+        :param stream_json: parse point responses while they are downloaded
+        """
+
         if api_key is None:
-            self.api_key = os.environ.get("REBASE_API_KEY")
+            api_key = os.environ.get("REBASE_API_KEY")
+        self.api_key = api_key
+        if base_url is not None:
+            self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.stream_json = stream_json
         self.headers = {
             "Authorization": f"Bearer {self.api_key}"
         }
+        self.latencies: list[dict] = []
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=max(max_workers, 1),
+                              pool_maxsize=max(max_workers, 1), max_retries=retry)
         self.session = Session()
-        self.session.headers = self.headers  # type: ignore
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # keep the default headers of the session, they accept gzip responses
+        self.session.headers.update(self.headers)
+
+        # requests that change data on the server are never retried
+        self.submit_session = Session()
+        no_retry = HTTPAdapter(max_retries=0)
+        self.submit_session.mount("http://", no_retry)
+        self.submit_session.mount("https://", no_retry)
+        self.submit_session.headers.update(self.headers)
+
+    def _request(self, method: str, url: str, retry: bool = True, **kwargs) -> Response:
+        """
+        Send a request through the session and record its latency.
+
+        For streamed requests the latency is the time until the headers
+        arrived and the size is not known.
+
+        :param method: HTTP method
+        :param url: URL of the endpoint
+        :param retry: retry failed requests, False for requests that are
+            not idempotent
+        :return: response of the last attempt
+        :rtype: Response
+        """
+
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session if retry else self.submit_session
+        start = time.perf_counter()
+        resp = session.request(method, url, **kwargs)
+        seconds = time.perf_counter() - start
+        self.latencies.append({
+            "method": method,
+            "endpoint": url.removeprefix(self.base_url),
+            "status_code": resp.status_code,
+            "seconds": seconds,
+            "bytes": None if kwargs.get("stream") else len(resp.content)
+        })
+        logger.debug("{} {}: statuscode={}, {:.3f}s",
+                     method, url, resp.status_code, seconds)
+        return resp
+
+    def _cached(
+        self,
+        endpoint: str,
+        params: dict,
+        fetch: Callable[[], pd.DataFrame],
+        nwp: bool = False
+    ) -> pd.DataFrame:
+        """
+        Serve a response from the cache or fetch and store it.
+
+        Weather responses are looked up by the latest NWP run that should
+        be published and stored under the reference time they contain,
+        so an older run that is still served by the API is fetched again.
+
+        :param endpoint: path of the API endpoint
+        :param params: query parameters or request body
+        :param fetch: requests the data from the API
+        :param nwp: the response is a weather forecast with ref_datetime
+        :return: response data
+        :rtype: DataFrame
+        """
+
+        if self.cache is None:
+            return fetch()
+
+        ref_time = self.cache.latest_nwp_run() if nwp else None
+        df = self.cache.get(endpoint, params, ref_time=ref_time)
+        if df is None and self.cache.offline:
+            df = self.cache.get(endpoint, params, latest=True)
+            if df is None:
+                raise FileNotFoundError(f"No cached response for {endpoint} {params} "
+                                        "in offline mode")
+        if df is not None:
+            return df
+
+        df = fetch()
+        if nwp and "ref_datetime" in df.columns and len(df):
+            ref_time = pd.to_datetime(df["ref_datetime"], utc=True).max()
+        self.cache.put(endpoint, params, df, ref_time=ref_time)
+        return df
+
+    def latency_summary(self) -> pd.DataFrame:
+        """
+        Summary of the recorded request latencies per endpoint.
+
+        :return: number of requests, mean, median and maximum seconds and
+            received bytes per method and endpoint
+        :rtype: DataFrame
+        """
+
+        latencies = pd.DataFrame(
+            self.latencies,
+            columns=["method", "endpoint", "status_code", "seconds", "bytes"]
+        )
+        return latencies.groupby(["method", "endpoint"]).agg(
+            requests=("seconds", "size"),
+            mean_seconds=("seconds", "mean"),
+            median_seconds=("seconds", "median"),
+            max_seconds=("seconds", "max"),
+            bytes=("bytes", "sum")
+        )
+
+    def fetch_all(self, calls: dict[str, Callable[[], object]]) -> dict[str, object]:
+        """
+        Run independent API calls, at most ``max_workers`` at once.
+
+        :param calls: functions without arguments by name
+        :return: results by name
+        :rtype: dict[str, object]
+        """
+
+        if self.max_workers <= 1 or len(calls) <= 1:
+            return {name: call() for name, call in calls.items()}
+        max_workers = min(self.max_workers, len(calls))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {name: executor.submit(call) for name, call in calls.items()}
+            return {name: future.result() for name, future in futures.items()}
 
     def get_variable(
         self,
@@ -56,13 +281,13 @@ class RebaseAPI:
         """
         url = f"{self.base_url}/challenges/data/{variable}"
         params = {"day": day}
-        logger.debug("GET from {}, day={}", url, day)
-        resp = self.session.get(url, params=params)
-        logger.debug("statuscode={}", resp.status_code)
 
-        data = resp.json()
-        df = pd.DataFrame(data)
-        return df
+        def fetch() -> pd.DataFrame:
+            resp = self._request("GET", url, params=params)
+            data = resp.json()
+            return pd.DataFrame(data)
+
+        return self._cached(f"challenges/data/{variable}", params, fetch)
 
     def get_solar_wind_forecast(self, day: str) -> pd.DataFrame:
         """
@@ -74,13 +299,13 @@ class RebaseAPI:
         """
         url = f"{self.base_url}/challenges/data/solar_and_wind_forecast"
         params = {"day": day}
-        logger.debug("GET from {}, day={}", url, day)
-        resp = self.session.get(url, params=params)
-        logger.debug("statuscode={}", resp.status_code)
 
-        data = resp.json()
-        df = pd.DataFrame(data)
-        return df
+        def fetch() -> pd.DataFrame:
+            resp = self._request("GET", url, params=params)
+            data = resp.json()
+            return pd.DataFrame(data)
+
+        return self._cached("challenges/data/solar_and_wind_forecast", params, fetch)
 
     def get_day_ahead_demand_forecast(self) -> list:
         """
@@ -90,9 +315,7 @@ class RebaseAPI:
         :rtype: Liste mit JSON-encodierten Responses
         """
         url = f"{self.base_url}/challenges/data/day_ahead_demand"
-        logger.debug("GET from {}", url)
-        resp = self.session.get(url)
-        logger.debug("statuscode={}", resp.status_code)
+        resp = self._request("GET", url)
 
         return resp.json()
 
@@ -104,9 +327,7 @@ class RebaseAPI:
         :rtype: Liste mit JSON-encodierten Responses
         """
         url = f"{self.base_url}/challenges/data/margin_forecast"
-        logger.debug("GET from {}", url)
-        resp = self.session.get(url)
-        logger.debug("statuscode={}", resp.status_code)
+        resp = self._request("GET", url)
 
         return resp.json()
 
@@ -116,8 +337,9 @@ class RebaseAPI:
         lats: list[float],
         lons: list[float],
         variables: str,
-        query_type: Literal["grid", "points"]
-    ) -> list:
+        query_type: Literal["grid", "points"],
+        stream: bool = False
+    ) -> list | Iterator:
         """
         POST-Request zum abfragen der Wetterdaten
 
@@ -126,7 +348,9 @@ class RebaseAPI:
         :param lons: Liste der Längengrade
         :param variables: Liste der Wettervariablen
         :param query_type: Format, wie Daten zurückgegeben werden
-        :return: abgefragte Daten
+        :param stream: Elemente der Antwort schon während des Downloads
+            einzeln parsen
+        :return: abgefragte Daten, bei stream ein Iterator über die Elemente
         :rtype: Liste mit JSON-encodierten Responses
         """
         url = f"{self.base_url}/weather/v2/query"
@@ -142,10 +366,13 @@ class RebaseAPI:
         logger.debug("POST from {}, model={}, lat={}, long={}, "
                      "variables={}, type={}",
                      url, model, lats, lons, variables, query_type)
-        resp = requests.post(
-            url, json=body, headers={"Authorization": self.api_key}, timeout=180
+        # the weather API expects the key without "Bearer"
+        resp = self._request(
+            "POST", url, json=body, headers={"Authorization": self.api_key},
+            stream=stream
         )
-        logger.debug("statuscode={}", resp.status_code)
+        if stream:
+            return _iter_json_array(resp.iter_content(chunk_size=2**20))
 
         return resp.json()
 
@@ -158,19 +385,63 @@ class RebaseAPI:
     ) -> pd.DataFrame:
         """ Daten werden als Liste zurückgegeben"""
 
-        data = self.query_weather_latest(
-            model, lats, lons, variables, "points"
-        )
+        def fetch() -> pd.DataFrame:
+            data = self.query_weather_latest(
+                model, lats, lons, variables, "points", stream=self.stream_json
+            )
 
-        df = pd.DataFrame()
-        for i, _ in enumerate(data):
-            new_df = pd.DataFrame(data[i])
-            new_df["point"] = i
-            new_df["latitude"] = lats[i]
-            new_df["longitude"] = lons[i]
-            df = pd.concat([df, new_df])
+            return self.points_to_frame(list(data), lats, lons)
 
-        return df
+        params = {"model": model, "latitude": lats, "longitude": lons,
+                  "variables": variables, "type": "points"}
+        return self._cached("weather/v2/query", params, fetch, nwp=True)
+
+    @staticmethod
+    def points_to_frame(
+        data: list,
+        lats: list[float],
+        lons: list[float]
+    ) -> pd.DataFrame:
+        """
+        Build one DataFrame of all points of a point response.
+
+        If every point is a mapping of equally long columns, the columns
+        of all points are joined and the frame is built once. Otherwise
+        one frame per point is built and they are concatenated once. As
+        before, the index restarts at 0 for every point.
+
+        :param data: one element per point
+        :param lats: latitude per point
+        :param lons: longitude per point
+        :return: data of all points with point, latitude and longitude
+        :rtype: DataFrame
+        """
+
+        if not data:
+            return pd.DataFrame()
+
+        columnar = all(isinstance(p, dict) and p.keys() == data[0].keys() for p in data)
+        if columnar:
+            lengths = [{len(v) if isinstance(v, list) else -1 for v in p.values()}
+                       for p in data]
+            columnar = all(len(n) == 1 and min(n) >= 0 for n in lengths)
+        if not columnar:
+            return pd.concat([
+                pd.DataFrame(point_data).assign(point=i, latitude=lats[i],
+                                                longitude=lons[i])
+                for i, point_data in enumerate(data)
+            ])
+
+        sizes = np.array([len(next(iter(p.values()))) for p in data])
+        columns = {key: list(chain.from_iterable(p[key] for p in data))
+                   for key in data[0]}
+        columns["point"] = np.repeat(np.arange(len(data)), sizes)
+        columns["latitude"] = np.repeat(np.asarray(lats[:len(data)], dtype=float),
+                                        sizes)
+        columns["longitude"] = np.repeat(np.asarray(lons[:len(data)], dtype=float),
+                                         sizes)
+        index = np.concatenate([np.arange(n) for n in sizes])
+        return pd.DataFrame(columns, index=index)
 
     def query_weather_latest_grid(
         self,
@@ -181,10 +452,13 @@ class RebaseAPI:
     ) -> pd.DataFrame:
         """Daten werden 'eben' zurückgegeben"""
 
-        data = self.query_weather_latest(model, lats, lons, variables, "grid")
-        df = pd.DataFrame(data)
+        def fetch() -> pd.DataFrame:
+            data = self.query_weather_latest(model, lats, lons, variables, "grid")
+            return pd.DataFrame(data)
 
-        return df
+        params = {"model": model, "latitude": lats, "longitude": lons,
+                  "variables": variables, "type": "grid"}
+        return self._cached("weather/v2/query", params, fetch, nwp=True)
 
     def get_hornsea_dwd(self):
         """
@@ -241,49 +515,97 @@ class RebaseAPI:
                     "TotalPrecipitation, RelativeHumidity"
         return self.query_weather_latest_points(model, lats, lons, variables)
 
-    def get_latest_forecast_data(self) -> pd.DataFrame:
+    def get_latest_forecast_data(
+        self,
+        feature_encoder: "OneHotEncoder | None" = None,
+        spatial_reducers: dict[str, list[dict]] | None = None,
+        nwp_sources: list[dict] | None = None,
+        required_columns: list[str] | None = None
+    ) -> pd.DataFrame:
         """
         Load lates data from rebase api and puts it in the right
         form for prediction.
 
+        The Hornsea and solar forecasts of all NWP models are fetched
+        concurrently. The latest runs of further models are aligned to the
+        primary model on ``valid_time`` and their columns are suffixed.
+
+        :param feature_encoder: fitted encoder from the data preparation,
+            adds the same dummy columns as in the training data
+        :param spatial_reducers: spatial reducers per weather data type,
+            the same as in the data preparation, default is the mean
+        :param nwp_sources: NWP models as in the data preparation, the first
+            is the primary model, default is DWD_ICON-EU only
+        :param required_columns: columns the model predicts from, only rows
+            with missing values in these columns are dropped, default are
+            all columns
         :return: data in the correct form for the model
         :rtype: DataFrame
+        :raises ValueError: if an NWP model is not supported
         """
-        raw_hornsea = self.get_hornsea_dwd()
-        hornsea_df = load_weather_data(weather_df_to_xr(raw_hornsea),
-                                       dtype="hornsea", api=True)
-
-        raw_solar = self.get_pes10_nwp("DWD_ICON-EU")
-        solar_df = load_weather_data(weather_df_to_xr(raw_solar),
-                                     dtype="solar", api=True)
-
-        latest_forecast_df = (
-            hornsea_df
-            .merge(solar_df, how="outer", on=["reference_time", "valid_time"])
-            # .set_index("valid_time")
-            # .resample("30min")
-            # .interpolate("linear", limit=5)
-            .rename(columns={"Temperature_x": "temp_hornsea",
-                             "Temperature_y": "temp_solar",
-                             "hours_after_x": "hours_after"})
-            .drop(columns="hours_after_y", axis=1)
+        nwp_sources = nwp_sources or [
+            {"name": "dwd", "model": "DWD_ICON-EU", "suffix": ""}
+        ]
+        hornsea_queries = {"DWD_ICON-EU": self.get_hornsea_dwd,
+                           "NCEP_GFS": self.get_hornsea_gfs}
+        calls = {}
+        for source in nwp_sources:
+            if source["model"] not in hornsea_queries:
+                raise ValueError(
+                    f"Unsupported NWP model {source['model']!r}, supported "
+                    f"models are {', '.join(hornsea_queries)}"
+                )
+            calls[f"{source['name']}_hornsea"] = hornsea_queries[source["model"]]
+            calls[f"{source['name']}_solar"] = partial(self.get_pes10_nwp,
+                                                       source["model"])
+        raw = self.fetch_all(calls)
+
+        forecasts = {}
+        for source in nwp_sources:
+            reducers = source.get("spatial_reducers", spatial_reducers or {})
+            for dtype in ("hornsea", "solar"):
+                forecasts[source["suffix"], dtype] = load_weather_data(
+                    weather_df_to_xr(raw[f"{source['name']}_{dtype}"]),
+                    dtype=dtype, api=True, reducers=reducers.get(dtype)
+                )
+
+        # only the latest run of every model is available, so newer runs of
+        # further models are aligned as well
+        primary, *further = [source["suffix"] for source in nwp_sources]
+        hornsea_df, solar_df = (
+            align_nwp_models(forecasts[primary, dtype],
+                             {suffix: forecasts[suffix, dtype] for suffix in further},
+                             direction="nearest")
+            for dtype in ("hornsea", "solar")
         )
+        latest_forecast_df = merge_weather_data(hornsea_df, solar_df,
+                                                (primary, *further))
         day_ahead_market_times_df = day_ahead_market_times()
         latest_forecast_df = (
             latest_forecast_df
+            .set_index("valid_time")
             .loc[day_ahead_market_times_df]
             .reset_index(names="valid_time")
         )
-        latest_forecast_df["year"] = latest_forecast_df.valid_time.dt.year
-        latest_forecast_df["month"] = latest_forecast_df.valid_time.dt.month
-        latest_forecast_df["day"] = latest_forecast_df.valid_time.dt.day
-        latest_forecast_df["hour"] = latest_forecast_df.valid_time.dt.hour
-
-        columns = ["hours_after", "year", "month", "day", "hour", "CloudCover",
-                   "SolarDownwardRadiation", "temp_hornsea", "RelativeHumidity",
-                   "temp_solar", "WindDirection", "WindDirection:100", "WindSpeed",
-                   "WindSpeed:100", "valid_time"]
-        latest_forecast_df = latest_forecast_df.dropna()[columns]
+        latest_forecast_df = add_calendar_features(latest_forecast_df)
+
+        weather_columns = ["CloudCover", "SolarDownwardRadiation", "temp_hornsea",
+                           "RelativeHumidity", "temp_solar", "WindDirection",
+                           "WindDirection:100", "WindSpeed", "WindSpeed:100"]
+        columns = ["hours_after", "year", "month", "day", "hour", *weather_columns,
+                   "valid_time"]
+        columns += [f"{column}{suffix}" for suffix in further
+                    for column in weather_columns]
+        if feature_encoder is not None:
+            latest_forecast_df = encode_categorical_features(latest_forecast_df,
+                                                             feature_encoder)
+            columns += list(feature_encoder.get_feature_names_out())
+        # a gap in a column the model does not use must not drop a row
+        latest_forecast_df = (
+            latest_forecast_df[columns]
+            .dropna(subset=required_columns)
+            .reset_index(drop=True)
+        )
 
         return latest_forecast_df
 
@@ -292,6 +614,6 @@ class RebaseAPI:
 
         url = f"{self.base_url}/challenges/{self.challenge_id}/submit"
 
-        resp = self.session.post(url, headers=self.headers, json=data)
+        resp = self._request("POST", url, retry=False, headers=self.headers, json=data)
         logger.info(resp)
         logger.info(resp.text)
@@ -0,0 +1,187 @@
+"""On-disk cache of Rebase API responses."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+from loguru import logger
+import pandas as pd
+
+
+class ResponseCache:
+    """
+    Stores API responses as parquet files, keyed by the endpoint, the
+    request parameters and, for weather queries, the NWP reference time.
+
+    Entries older than ``ttl_seconds`` are not served. If the files
+    exceed ``max_size_mb`` the least recently used entries are removed.
+    In offline mode expired entries are served as well and for weather
+    queries the latest cached NWP run is used.
+    """
+
+    def __init__(
+        self,
+        root_dir: Path,
+        ttl_seconds: float,
+        max_size_mb: float,
+        offline: bool = False,
+        nwp_run_interval: str = "6h",
+        nwp_publication_delay: str = "5h"
+    ) -> None:
+        """
+        Constructor for ResponseCache class.
+
+        :param root_dir: directory of the parquet files and the index
+        :param ttl_seconds: seconds an entry is served after it was stored
+        :param max_size_mb: maximum size of all parquet files
+        :param offline: serve only from the cache
+        :param nwp_run_interval: time between two NWP runs
+        :param nwp_publication_delay: time after which a NWP run is available
+        """
+
+        self.root_dir = Path(root_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_size_mb = max_size_mb
+        self.offline = offline
+        self.nwp_run_interval = pd.Timedelta(nwp_run_interval)
+        self.nwp_publication_delay = pd.Timedelta(nwp_publication_delay)
+        self.index_path = self.root_dir / "index.json"
+        # the API fetches several queries at once
+        self._lock = threading.Lock()
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        if self.index_path.exists():
+            with self.index_path.open("r", encoding="utf-8") as f:
+                self._index: dict[str, dict] = json.load(f)
+        else:
+            self._index = {}
+
+    @staticmethod
+    def request_key(endpoint: str, params: dict) -> str:
+        """
+        Key of a request, independent of the NWP reference time.
+
+        :param endpoint: path of the API endpoint
+        :param params: query parameters or request body
+        :return: hex digest
+        :rtype: str
+        """
+
+        payload = json.dumps([endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+    def latest_nwp_run(self, now: pd.Timestamp | None = None) -> pd.Timestamp:
+        """
+        Reference time of the latest NWP run that should be published.
+
+        :param now: point in time, default is the current time
+        :return: reference time in UTC
+        :rtype: Timestamp
+        """
+
+        now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+        return (now - self.nwp_publication_delay).floor(self.nwp_run_interval)
+
+    def _save_index(self) -> None:
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def get(
+        self,
+        endpoint: str,
+        params: dict,
+        ref_time: pd.Timestamp | None = None,
+        latest: bool = False
+    ) -> pd.DataFrame | None:
+        """
+        Load a cached response.
+
+        :param endpoint: path of the API endpoint
+        :param params: query parameters or request body
+        :param ref_time: NWP reference time of the response
+        :param latest: use the entry with the latest NWP reference time
+        :return: cached data, None if there is no valid entry
+        :rtype: DataFrame | None
+        """
+
+        request_key = self.request_key(endpoint, params)
+        ref_time = None if ref_time is None else str(pd.Timestamp(ref_time))
+        with self._lock:
+            entries = [(key, entry) for key, entry in self._index.items()
+                       if entry["request"] == request_key
+                       and (latest or entry["ref_time"] == ref_time)]
+            if not entries:
+                return None
+            key, entry = max(entries, key=lambda item: str(item[1]["ref_time"]))
+            if not self.offline and time.time() - entry["created"] > self.ttl_seconds:
+                return None
+            path = self.root_dir / f"{key}.parquet"
+            if not path.exists():
+                del self._index[key]
+                self._save_index()
+                return None
+            entry["last_access"] = time.time()
+            self._save_index()
+        logger.debug("Cache hit for {} {}", endpoint, entry["ref_time"] or "")
+        return pd.read_parquet(path)
+
+    def put(
+        self,
+        endpoint: str,
+        params: dict,
+        df: pd.DataFrame,
+        ref_time: pd.Timestamp | None = None
+    ) -> None:
+        """
+        Store a response and remove the least recently used entries
+        if the cache is too large.
+
+        :param endpoint: path of the API endpoint
+        :param params: query parameters or request body
+        :param df: response data
+        :param ref_time: NWP reference time of the response
+        """
+
+        request_key = self.request_key(endpoint, params)
+        ref_time = None if ref_time is None else str(pd.Timestamp(ref_time))
+        key = request_key if ref_time is None else \
+            f"{request_key}_{pd.Timestamp(ref_time):%Y%m%d%H%M}"
+        path = self.root_dir / f"{key}.parquet"
+        with self._lock:
+            df.to_parquet(path)
+            now = time.time()
+            self._index[key] = {
+                "endpoint": endpoint,
+                "request": request_key,
+                "ref_time": ref_time,
+                "created": now,
+                "last_access": now,
+                "bytes": path.stat().st_size
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self) -> None:
+        max_bytes = self.max_size_mb * 2**20
+        total = sum(entry["bytes"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(),
+                                 key=lambda item: item[1]["last_access"]):
+            if total <= max_bytes:
+                break
+            (self.root_dir / f"{key}.parquet").unlink(missing_ok=True)
+            total -= entry["bytes"]
+            del self._index[key]
+            logger.debug("Removed {} from the response cache", key)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+
+        with self._lock:
+            for key in self._index:
+                (self.root_dir / f"{key}.parquet").unlink(missing_ok=True)
+            self._index = {}
+            self._save_index()
@@ -1,64 +1,24 @@
 """Main program."""
 
-from typing import Final
+import argparse
 
-from loguru import logger
-
-from dopro2_HEFTcom_challenge.config import config_logger
-from dopro2_HEFTcom_challenge.pipeline import (
-    DataIngestionTrainingPipeline,
-    DataPreparationTrainingPipeline,
-    ModelEvaluationPipeline,
-    ModelTrainingPipeline
-)
+from dopro2_HEFTcom_challenge.config import ConfigurationManager, config_logger
+from dopro2_HEFTcom_challenge.pipeline import Orchestrator, training_stages
 
 
-STAGE_NAME_01: Final = "Data Ingestion stage"
+parser = argparse.ArgumentParser(description="Run the training pipeline.")
+parser.add_argument("--force", action="store_true",
+                    help="run all stages even if their outputs are current")
+args = parser.parse_args()
 
 # set up logging
 config_logger()
 
-try:
-    logger.info(">>> stage {} started <<<", STAGE_NAME_01)
-    obj = DataIngestionTrainingPipeline()
-    obj.main()
-    logger.info(">>> stage {} completed <<<", STAGE_NAME_01)
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-
-STAGE_NAME_02: Final = "Data Preparation stage"
-
-try:
-    logger.info(">>> stage {} started <<<", STAGE_NAME_02)
-    obj = DataPreparationTrainingPipeline()
-    obj.main()
-    logger.info(">>> stage {} completed <<<", STAGE_NAME_02)
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-
-STAGE_NAME_03: Final = "Model training stage"
-
-try:
-    logger.info(">>> stage {} started <<<", STAGE_NAME_03)
-    obj = ModelTrainingPipeline()
-    obj.main()
-    logger.info(">>> stage {} completed <<<", STAGE_NAME_03)
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-
-STAGE_NAME_04: Final = "Model evaluation stage"
-
-try:
-    logger.info(">>> stage {} started <<<", STAGE_NAME_04)
-    obj = ModelEvaluationPipeline()
-    obj.main()
-    logger.info(">>> stage {} completed <<<", STAGE_NAME_04)
-except Exception as e:
-    logger.exception(e)
-    raise e
+configuration = ConfigurationManager()
+orchestrator = Orchestrator(
+    stages=training_stages(configuration),
+    config=configuration.get_orchestration_config(),
+    configuration=configuration,
+    force=args.force
+)
+orchestrator.run()
@@ -1,19 +1,64 @@
 """Module for the different pipeline stages."""
 
-from dopro2_HEFTcom_challenge.pipeline.stage_01_data_ingestion import \
-    DataIngestionTrainingPipeline
-from dopro2_HEFTcom_challenge.pipeline.stage_02_data_preparation import \
-    DataPreparationTrainingPipeline
-from dopro2_HEFTcom_challenge.pipeline.stage_03_training import ModelTrainingPipeline
-from dopro2_HEFTcom_challenge.pipeline.stage_04_evaluation import \
-    ModelEvaluationPipeline
-from dopro2_HEFTcom_challenge.pipeline.stage_05_prediction import PredictionPipeline
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Final
+
+if TYPE_CHECKING:
+    from dopro2_HEFTcom_challenge.pipeline.orchestrator import (
+        Orchestrator,
+        Stage,
+        training_stages
+    )
+    from dopro2_HEFTcom_challenge.pipeline.stage_01_data_ingestion import \
+        DataIngestionTrainingPipeline
+    from dopro2_HEFTcom_challenge.pipeline.stage_02_data_preparation import \
+        DataPreparationTrainingPipeline
+    from dopro2_HEFTcom_challenge.pipeline.stage_02_model_data import ModelDataPipeline
+    from dopro2_HEFTcom_challenge.pipeline.stage_03_training import \
+        ModelTrainingPipeline
+    from dopro2_HEFTcom_challenge.pipeline.stage_04_evaluation import \
+        ModelEvaluationPipeline
+    from dopro2_HEFTcom_challenge.pipeline.stage_05_prediction import PredictionPipeline
+    from dopro2_HEFTcom_challenge.pipeline.stage_06_backtest import BacktestPipeline
 
 
 __all__: list[str] = [
+    "BacktestPipeline",
     "DataIngestionTrainingPipeline",
     "DataPreparationTrainingPipeline",
+    "ModelDataPipeline",
     "ModelEvaluationPipeline",
     "ModelTrainingPipeline",
-    "PredictionPipeline"
+    "Orchestrator",
+    "PredictionPipeline",
+    "Stage",
+    "training_stages"
 ]
+
+# stages are imported on first use, see components/__init__.py
+_LAZY_IMPORTS: Final = {
+    "BacktestPipeline": "dopro2_HEFTcom_challenge.pipeline.stage_06_backtest",
+    "DataIngestionTrainingPipeline":
+        "dopro2_HEFTcom_challenge.pipeline.stage_01_data_ingestion",
+    "DataPreparationTrainingPipeline":
+        "dopro2_HEFTcom_challenge.pipeline.stage_02_data_preparation",
+    "ModelDataPipeline": "dopro2_HEFTcom_challenge.pipeline.stage_02_model_data",
+    "ModelEvaluationPipeline": "dopro2_HEFTcom_challenge.pipeline.stage_04_evaluation",
+    "ModelTrainingPipeline": "dopro2_HEFTcom_challenge.pipeline.stage_03_training",
+    "Orchestrator": "dopro2_HEFTcom_challenge.pipeline.orchestrator",
+    "PredictionPipeline": "dopro2_HEFTcom_challenge.pipeline.stage_05_prediction",
+    "Stage": "dopro2_HEFTcom_challenge.pipeline.orchestrator",
+    "training_stages": "dopro2_HEFTcom_challenge.pipeline.orchestrator"
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,346 @@
+"""Run the pipeline stages and skip the ones whose outputs are current."""
+
+from dataclasses import dataclass, field
+import hashlib
+from importlib import import_module
+from importlib.util import find_spec
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+from loguru import logger
+import psutil
+
+from dopro2_HEFTcom_challenge.config import ConfigurationManager
+from dopro2_HEFTcom_challenge.entity import OrchestrationConfig
+
+
+PACKAGE = "dopro2_HEFTcom_challenge"
+# code every stage depends on, config/configuration.py turns config.yaml and
+# params.yaml into the config entities of the stages
+SHARED_MODULES = (f"{PACKAGE}.config", f"{PACKAGE}.entity", f"{PACKAGE}.utils")
+
+
+@dataclass(frozen=True)
+class Stage:
+    """Declaration of a pipeline stage and the files and settings it depends on."""
+
+    name: str
+    """Name of the stage in the logs and the state file."""
+
+    pipeline: str
+    """Pipeline class as 'module:Class', imported when the stage runs."""
+
+    inputs: tuple[str, ...] = ()
+    """Files or directories the stage reads."""
+
+    outputs: tuple[str, ...] = ()
+    """Files or directories the stage writes."""
+
+    config_sections: tuple[str, ...] = ()
+    """Sections of config.yaml the stage uses."""
+
+    params_sections: tuple[str, ...] = ()
+    """Sections of params.yaml the stage uses."""
+
+    modules: tuple[str, ...] = field(default=SHARED_MODULES)
+    """Modules or packages whose source is part of the stage fingerprint."""
+
+
+def path_fingerprint(paths: tuple[str, ...]) -> dict[str, list[int] | None]:
+    """
+    Size and modification time of the files, directories are walked.
+
+    :param paths: files or directories
+    :return: [size, mtime_ns] by file path, None for missing paths
+    :rtype: dict[str, list[int] | None]
+    """
+
+    fingerprint = {}
+    for path in map(Path, paths):
+        if path.is_dir():
+            files = sorted(p for p in path.rglob("*") if p.is_file())
+            if not files:
+                fingerprint[str(path)] = None
+            for file in files:
+                stat = file.stat()
+                fingerprint[str(file)] = [stat.st_size, stat.st_mtime_ns]
+        elif path.is_file():
+            stat = path.stat()
+            fingerprint[str(path)] = [stat.st_size, stat.st_mtime_ns]
+        else:
+            fingerprint[str(path)] = None
+    return fingerprint
+
+
+def code_fingerprint(modules: tuple[str, ...]) -> str:
+    """
+    Hash of the source files of modules and packages, without importing them.
+
+    :param modules: dotted module or package names
+    :return: sha256 hex digest
+    :rtype: str
+    """
+
+    digest = hashlib.sha256()
+    for module in sorted(modules):
+        origin = Path(find_spec(module).origin)
+        if origin.name == "__init__.py":
+            files = sorted(origin.parent.rglob("*.py"))
+        else:
+            files = [origin]
+        for file in files:
+            digest.update(file.name.encode())
+            digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+class PeakMemory:
+    """Sample the resident memory of the process and its children in a thread."""
+
+    def __init__(self, interval: float = 0.1) -> None:
+        """
+        Constructor for PeakMemory class.
+
+        :param interval: seconds between two samples
+        """
+
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _rss(self) -> int:
+        rss = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+
+    def _sample(self) -> None:
+        while True:
+            self.peak = max(self.peak, self._rss())
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self) -> "PeakMemory":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+
+class Orchestrator:
+    """Class to run pipeline stages and skip stages whose outputs are current."""
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        config: OrchestrationConfig,
+        configuration: ConfigurationManager,
+        force: bool = False
+    ) -> None:
+        """
+        Constructor for Orchestrator class.
+
+        :param stages: stages in the order they run
+        :param config: config values from config.yaml
+        :param configuration: parsed config.yaml and params.yaml
+        :param force: run all stages even if their outputs are current
+        """
+
+        self.stages = stages
+        self.config = config
+        self.configuration = configuration
+        self.force = force
+        self.state_path = Path(config.state_path)
+        if self.state_path.exists():
+            with self.state_path.open("r", encoding="utf-8") as f:
+                self.state: dict = json.load(f)
+        else:
+            self.state = {}
+
+    def stage_hash(self, stage: Stage) -> str:
+        """
+        Hash of the stage code, its config and params sections and its inputs.
+
+        :param stage: stage declaration
+        :return: sha256 hex digest
+        :rtype: str
+        """
+
+        module = stage.pipeline.split(":")[0]
+        payload = {
+            "code": code_fingerprint((module, *stage.modules)),
+            "config": {s: self.configuration.config.get(s)
+                       for s in stage.config_sections},
+            "params": {s: self.configuration.params.get(s)
+                       for s in stage.params_sections},
+            "inputs": path_fingerprint(stage.inputs)
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def is_current(self, stage: Stage, stage_hash: str) -> bool:
+        """
+        Check whether the stage ran with the same hash and its outputs are untouched.
+
+        :param stage: stage declaration
+        :param stage_hash: hash of the stage
+        :return: True if the stage can be skipped
+        :rtype: bool
+        """
+
+        previous = self.state.get(stage.name)
+        if previous is None or previous["hash"] != stage_hash:
+            return False
+        outputs = path_fingerprint(stage.outputs)
+        if any(value is None for value in outputs.values()):
+            return False
+        return outputs == previous["outputs"]
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.state_path.open("w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+
+    def run_stage(self, stage: Stage) -> dict:
+        """
+        Run a stage unless its outputs are current.
+
+        :param stage: stage declaration
+        :return: time, cache hit and peak memory of the stage
+        :rtype: dict
+        """
+
+        start = time.perf_counter()
+        stage_hash = self.stage_hash(stage)
+        if not self.force and self.is_current(stage, stage_hash):
+            report = {"stage": stage.name, "cache_hit": True,
+                      "seconds": round(time.perf_counter() - start, 3),
+                      "peak_rss_mb": None}
+            logger.info(">>> stage {} skipped, outputs are current <<<", stage.name)
+            return report
+
+        logger.info(">>> stage {} started <<<", stage.name)
+        module, name = stage.pipeline.split(":")
+        with PeakMemory(self.config.memory_sample_interval) as memory:
+            getattr(import_module(module), name)().main()
+        # hash again so the state holds the inputs as they were read
+        self.state[stage.name] = {"hash": self.stage_hash(stage),
+                                  "outputs": path_fingerprint(stage.outputs)}
+        self._save_state()
+
+        report = {"stage": stage.name, "cache_hit": False,
+                  "seconds": round(time.perf_counter() - start, 3),
+                  "peak_rss_mb": round(memory.peak / 2**20, 1)}
+        logger.info(">>> stage {} completed in {:.1f}s, peak memory {:.0f} MB <<<",
+                    stage.name, report["seconds"], report["peak_rss_mb"])
+        return report
+
+    def run(self) -> list[dict]:
+        """
+        Run all stages in order and write the report.
+
+        :return: time, cache hit and peak memory per stage
+        :rtype: list[dict]
+        """
+
+        reports = []
+        for stage in self.stages:
+            try:
+                reports.append(self.run_stage(stage))
+            except Exception as e:
+                logger.exception(e)
+                raise e
+
+        report_path = Path(self.config.report_path)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with report_path.open("w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        logger.info("Stage report saved at {}", report_path)
+        return reports
+
+
+def training_stages(configuration: ConfigurationManager) -> list[Stage]:
+    """
+    Declare the stages of the training pipeline with their inputs and outputs.
+
+    :param configuration: parsed config.yaml and params.yaml
+    :return: stages in the order they run
+    :rtype: list[Stage]
+    """
+
+    config = configuration.config
+    ingestion = config["data_ingestion"]
+    preparation = config["data_preparation"]
+    training = config["training"]
+    evaluation = config["evaluation"]
+    quantiles = configuration.params["quantile_regression"]["quantiles"]
+
+    # only checkpoints the stage writes can be declared as outputs
+    checkpoints = preparation["checkpoints"]
+    if checkpoints is not None and "merged_data_features" not in checkpoints:
+        raise ValueError("data_preparation.checkpoints has to contain "
+                         "merged_data_features, the model data stage reads it")
+    features_path = f"{preparation['root_dir']}/merged_data_features.parquet"
+    models_path = training["trained_models_path"]
+
+    return [
+        Stage(
+            name="Data Ingestion stage",
+            pipeline=f"{PACKAGE}.pipeline.stage_01_data_ingestion:"
+                     "DataIngestionTrainingPipeline",
+            outputs=(ingestion["root_dir"],),
+            config_sections=("data_ingestion",),
+            modules=(*SHARED_MODULES, f"{PACKAGE}.components.data_ingestion")
+        ),
+        Stage(
+            name="Data Preparation stage",
+            pipeline=f"{PACKAGE}.pipeline.stage_02_data_preparation:"
+                     "DataPreparationTrainingPipeline",
+            inputs=(preparation["weather_data_path"], preparation["energy_data_path"]),
+            outputs=(preparation["feature_encoder_path"], features_path,
+                     preparation["training_data_path"], preparation["test_data_path"]),
+            config_sections=("data_preparation",),
+            modules=(*SHARED_MODULES, f"{PACKAGE}.components.data_preparation")
+        ),
+        Stage(
+            name="Model data stage",
+            pipeline=f"{PACKAGE}.pipeline.stage_02_model_data:ModelDataPipeline",
+            inputs=(features_path,),
+            outputs=(preparation["model_data_path"],),
+            config_sections=("data_preparation",),
+            modules=(*SHARED_MODULES, f"{PACKAGE}.components.data_preparation")
+        ),
+        Stage(
+            name="Model training stage",
+            pipeline=f"{PACKAGE}.pipeline.stage_03_training:ModelTrainingPipeline",
+            inputs=(training["training_data_path"], training["feature_encoder_path"]),
+            outputs=(training["model_bundle_path"],
+                     *(f"{models_path}/model_q{q}.pickle" for q in quantiles),
+                     f"{models_path}/{Path(training['feature_encoder_path']).name}",
+                     f"{training['root_dir']}/fit_report.json"),
+            config_sections=("training", "data_preparation"),
+            params_sections=("quantile_regression",),
+            modules=(*SHARED_MODULES, f"{PACKAGE}.components.training")
+        ),
+        Stage(
+            name="Model evaluation stage",
+            pipeline=f"{PACKAGE}.pipeline.stage_04_evaluation:ModelEvaluationPipeline",
+            inputs=(evaluation["training_data_path"], evaluation["model_bundle_path"],
+                    evaluation["feature_encoder_path"]),
+            outputs=("score.txt", f"{evaluation['root_dir']}/pinball_breakdown.json"),
+            config_sections=("evaluation",),
+            params_sections=("quantile_regression",),
+            modules=(*SHARED_MODULES, f"{PACKAGE}.components.evaluation")
+        )
+    ]
@@ -25,8 +25,11 @@ class DataPreparationTrainingPipeline:
         hornsea, solar = data_preparation.cleaning_weather_data()
         merged_data = data_preparation.merge_data(energy, hornsea, solar)
         merged_table_features = data_preparation.create_features(merged_data)
-        data_preparation.splitting_data(merged_table_features)
-        data_preparation.transform_data()
+        splits = data_preparation.splitting_data(merged_table_features, write=False)
+        splits = data_preparation.transform_data(splits)
+        data_preparation.write_splits(splits)
+        data_preparation.wait_for_checkpoints()
+        data_preparation.save_memory_report()
 
 
 if __name__ == "__main__":
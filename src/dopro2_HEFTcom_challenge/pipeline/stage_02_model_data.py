@@ -0,0 +1,35 @@
+"""Second ML Pipeline stage, part two: data the models are trained on."""
+
+from typing import Final
+
+from loguru import logger
+
+from dopro2_HEFTcom_challenge.components import DataPreparation
+from dopro2_HEFTcom_challenge.config import ConfigurationManager
+
+
+STAGE_NAME: Final = "Model data stage"
+
+
+class ModelDataPipeline:
+    """Pipeline that creates the training data of the models."""
+
+    def __init__(self):
+        pass
+
+    def main(self):
+        config = ConfigurationManager()
+        data_preparation_config = config.get_data_preparation_config()
+        data_preparation = DataPreparation(config=data_preparation_config)
+        data_preparation.create_model_data()
+
+
+if __name__ == "__main__":
+    try:
+        logger.info(">>> stage {} started <<<", STAGE_NAME)
+        obj = ModelDataPipeline()
+        obj.main()
+        logger.info(">>> stage {} completed <<<", STAGE_NAME)
+    except Exception as e:
+        logger.exception(e)
+        raise e
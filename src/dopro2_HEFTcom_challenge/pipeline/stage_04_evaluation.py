@@ -7,11 +7,6 @@ from loguru import logger
 from dopro2_HEFTcom_challenge.components import Evaluation
 from dopro2_HEFTcom_challenge.config import ConfigurationManager
 
-import dagshub
-dagshub.init(  # type: ignore
-    repo_owner="tombeihofer23", repo_name="DoPro2", mlflow=True
-)
-
 
 STAGE_NAME: Final = "Model evaluation stage"
 
@@ -23,12 +18,20 @@ class ModelEvaluationPipeline:
         pass
 
     def main(self):
+        import dagshub
+        dagshub.init(  # type: ignore
+            repo_owner="tombeihofer23", repo_name="DoPro2", mlflow=True
+        )
+
         config = ConfigurationManager()
         eval_config = config.get_evaluation_config()
         evaluation = Evaluation(config=eval_config)
         evaluation.make_predictions()
         evaluation.evaluation()
         evaluation.log_into_mlflow()
+        # the stage only completes once the run is logged, errors of the
+        # background logging are raised here
+        evaluation.wait_for_mlflow()
 
 
 if __name__ == "__main__":
@@ -1,33 +1,82 @@
 """Fifth ML Pipeline stage: predict on new data."""
 
+from loguru import logger
+
+from dopro2_HEFTcom_challenge.config import ConfigurationManager
 from dopro2_HEFTcom_challenge.utils import (
-    load_models,
+    load_feature_encoder,
     prep_submission_in_json_format
 )
-from dopro2_HEFTcom_challenge.entity import RebaseAPI
+from dopro2_HEFTcom_challenge.entity import (
+    PredictionConfig,
+    QuantileModelBundle,
+    RebaseAPI,
+    ResponseCache
+)
 
 
 class PredictionPipeline:
     """Pipeline that make predictions on you data from Rebase API."""
 
-    api: RebaseAPI = RebaseAPI()
-
     def __init__(self):
-        pass
+        self._config: PredictionConfig | None = None
+        self._api: RebaseAPI | None = None
+
+    @property
+    def config(self) -> PredictionConfig:
+        """Prediction config, loaded on first use."""
+
+        if self._config is None:
+            self._config = ConfigurationManager().get_prediction_config()
+        return self._config
+
+    @property
+    def api(self) -> RebaseAPI:
+        """Rebase API client, created on first use."""
+
+        if self._api is None:
+            cache_config = ConfigurationManager().get_response_cache_config()
+            cache = None
+            if cache_config.enabled:
+                cache = ResponseCache(
+                    root_dir=cache_config.root_dir,
+                    ttl_seconds=cache_config.ttl_seconds,
+                    max_size_mb=cache_config.max_size_mb,
+                    offline=cache_config.offline,
+                    nwp_run_interval=cache_config.nwp_run_interval,
+                    nwp_publication_delay=cache_config.nwp_publication_delay
+                )
+            self._api = RebaseAPI(
+                base_url=self.config.api_base_url,
+                max_workers=self.config.api_max_workers,
+                retries=self.config.api_retries,
+                backoff_factor=self.config.api_backoff_factor,
+                timeout=self.config.api_timeout,
+                cache=cache,
+                stream_json=self.config.api_stream_json
+            )
+        return self._api
 
     def predict(self) -> None:
         """Load model and latest forecasts to make prediction."""
 
-        models = load_models("artifacts/training/models")  # type: ignore
-        latest_data = self.api.get_latest_forecast_data()
+        config = self.config
+        bundle = QuantileModelBundle.load(config.model_bundle_path)
+        encoder = load_feature_encoder(config.feature_encoder_path)
+        nwp_sources = bundle.nwp_sources
+        if nwp_sources is None:
+            logger.warning("The model bundle does not list its NWP models, "
+                           "the forecasts of all nwp_sources are fetched")
+            nwp_sources = config.nwp_sources
+        latest_data = self.api.get_latest_forecast_data(
+            feature_encoder=encoder, spatial_reducers=config.spatial_reducers,
+            nwp_sources=nwp_sources, required_columns=bundle.variables
+        )
 
         submission_data = latest_data.copy()
-        for i, model in enumerate(models):
-            submission_data[f"q{(i + 1) * 10}"] = model.predict(
-                latest_data
-            )
-            submission_data.loc[submission_data[f"q{(i + 1) * 10}"] < 0,
-                                f"q{(i + 1) * 10}"] = 0
+        quantiles = bundle.predict(latest_data)
+        quantiles[quantiles < 0] = 0
+        submission_data[bundle.columns] = quantiles
 
         submission_data["market_bid"] = submission_data["q50"]
 
@@ -35,6 +84,7 @@ class PredictionPipeline:
         print(submission_data_json)
 
         self.api.submit(submission_data_json)
+        logger.info("Rebase API latencies:\n{}", self.api.latency_summary().to_string())
 
 
 if __name__ == "__main__":
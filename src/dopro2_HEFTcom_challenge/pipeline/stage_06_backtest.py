@@ -0,0 +1,35 @@
+"""Sixth ML Pipeline stage: rolling-origin backtest."""
+
+from typing import Final
+
+from loguru import logger
+
+from dopro2_HEFTcom_challenge.components import Backtest
+from dopro2_HEFTcom_challenge.config import ConfigurationManager
+
+
+STAGE_NAME: Final = "Backtest stage"
+
+
+class BacktestPipeline:
+    """Pipeline that backtests the model on rolling origins."""
+
+    def __init__(self):
+        pass
+
+    def main(self):
+        config = ConfigurationManager()
+        backtest_config = config.get_backtest_config()
+        backtest = Backtest(config=backtest_config)
+        backtest.run()
+
+
+if __name__ == "__main__":
+    try:
+        logger.info(">>> stage {} started <<<", STAGE_NAME)
+        obj = BacktestPipeline()
+        obj.main()
+        logger.info(">>> stage {} completed <<<", STAGE_NAME)
+    except Exception as e:
+        logger.exception(e)
+        raise e
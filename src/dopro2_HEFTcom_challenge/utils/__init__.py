@@ -1,24 +1,93 @@
 """Module for util functions."""
 
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Final
+
 from dopro2_HEFTcom_challenge.utils.utils import (
+    CATEGORICAL_FEATURES,
+    SEASON_LABELS,
+    TIME_OF_DAY_LABELS,
+    WIND_DIR_LABELS,
+    add_calendar_features,
+    align_nwp_models,
+    apply_dtype_policy,
     categorize_wind_dir,
+    categorize_wind_dir_vectorized,
     get_season,
+    get_season_vectorized,
     get_time_of_day,
+    get_time_of_day_vectorized,
     day_ahead_market_times,
+    encode_categorical_features,
+    fit_feature_encoder,
+    load_feature_encoder,
     load_models,
     load_weather_data,
+    merge_weather_data,
     prep_submission_in_json_format,
-    weather_df_to_xr
+    read_parquet_projected,
+    read_partitioned_parquet,
+    reduce_spatial,
+    remove_partitioned_files,
+    resample_interpolate,
+    resample_interpolate_vectorized,
+    weather_df_to_xr,
+    write_partitioned_parquet
 )
+from dopro2_HEFTcom_challenge.utils.scoring import pinball_loss, pinball_scores
+
+if TYPE_CHECKING:
+    from dopro2_HEFTcom_challenge.utils.quantreg import WarmStartQuantReg
 
 
 __all__: list[str] = [
+    "CATEGORICAL_FEATURES",
+    "SEASON_LABELS",
+    "TIME_OF_DAY_LABELS",
+    "WIND_DIR_LABELS",
+    "WarmStartQuantReg",
+    "add_calendar_features",
+    "align_nwp_models",
+    "apply_dtype_policy",
     "categorize_wind_dir",
+    "categorize_wind_dir_vectorized",
     "get_season",
+    "get_season_vectorized",
     "get_time_of_day",
+    "get_time_of_day_vectorized",
     "day_ahead_market_times",
+    "encode_categorical_features",
+    "fit_feature_encoder",
+    "load_feature_encoder",
     "load_models",
     "load_weather_data",
+    "merge_weather_data",
+    "pinball_loss",
+    "pinball_scores",
     "prep_submission_in_json_format",
-    "weather_df_to_xr"
+    "read_parquet_projected",
+    "read_partitioned_parquet",
+    "reduce_spatial",
+    "remove_partitioned_files",
+    "resample_interpolate",
+    "resample_interpolate_vectorized",
+    "weather_df_to_xr",
+    "write_partitioned_parquet"
 ]
+
+# statsmodels is only imported when the quantile regression is used
+_LAZY_IMPORTS: Final = {
+    "WarmStartQuantReg": "dopro2_HEFTcom_challenge.utils.quantreg"
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,149 @@
+"""Quantile regression that can be warm-started from a previous solution."""
+
+import warnings
+
+import numpy as np
+from numpy.linalg import pinv
+from scipy import stats
+from scipy.stats import norm
+from statsmodels.regression.linear_model import RegressionResultsWrapper
+from statsmodels.regression.quantile_regression import (
+    QuantReg,
+    QuantRegResults,
+    bofinger,
+    chamberlain,
+    hall_sheather,
+    kernels
+)
+from statsmodels.tools.sm_exceptions import (
+    ConvergenceWarning,
+    IterationLimitWarning
+)
+
+
+__all__: list[str] = ["WarmStartQuantReg"]
+
+_BANDWIDTHS = {
+    "hsheather": hall_sheather,
+    "bofinger": bofinger,
+    "chamberlain": chamberlain
+}
+
+
+class WarmStartQuantReg(QuantReg):
+    """
+    QuantReg whose IRLS iterations can start from the parameters of a
+    previous fit, e.g. of the neighbouring quantile.
+
+    Without start_params the fit is the same as QuantReg.fit (statsmodels
+    0.14). The results have the additional attribute ``converged``.
+    """
+
+    def fit(self, q=.5, vcov="robust", kernel="epa", bandwidth="hsheather",
+            max_iter=1000, p_tol=1e-6, start_params=None, **kwargs):
+        """
+        Solve by iterative weighted least squares.
+
+        :param q: quantile, strictly between 0 and 1
+        :param vcov: "robust" or "iid" covariance matrix
+        :param kernel: kernel of the density estimation ("biw", "cos", "epa",
+            "gau", "par")
+        :param bandwidth: "hsheather", "bofinger" or "chamberlain"
+        :param max_iter: maximum number of IRLS iterations
+        :param p_tol: convergence tolerance of the parameters
+        :param start_params: parameters to compute the first IRLS weights
+            from, None starts with OLS like QuantReg
+        :return: fitted results
+        :rtype: RegressionResultsWrapper
+        """
+
+        if q <= 0 or q >= 1:
+            raise ValueError("q must be strictly between 0 and 1")
+        if kernel not in kernels:
+            raise ValueError("kernel must be one of " + ", ".join(kernels))
+        if bandwidth not in _BANDWIDTHS:
+            raise ValueError("bandwidth must be one of " + ", ".join(_BANDWIDTHS))
+        kernel = kernels[kernel]
+        bandwidth = _BANDWIDTHS[bandwidth]
+
+        endog = self.endog
+        exog = self.exog
+        nobs = self.nobs
+        self.rank = np.linalg.matrix_rank(self.exog)
+        self.df_model = float(self.rank - self.k_constant)
+        self.df_resid = self.nobs - self.rank
+
+        if start_params is None:
+            beta = np.ones(exog.shape[1])
+            xstar = exog
+        else:
+            beta = np.asarray(start_params, dtype=np.float64)
+            if beta.shape != (exog.shape[1],):
+                raise ValueError("start_params has wrong length")
+            xstar = exog / self._irls_weights(endog - np.dot(exog, beta), q)[:, None]
+
+        n_iter = 0
+        diff = 10
+        cycle = False
+        history = dict(params=[], mse=[])
+        while n_iter < max_iter and diff > p_tol and not cycle:
+            n_iter += 1
+            beta0 = beta
+            xtx = np.dot(xstar.T, exog)
+            xty = np.dot(xstar.T, endog)
+            beta = np.dot(pinv(xtx), xty)
+            resid = self._irls_weights(endog - np.dot(exog, beta), q)
+            xstar = exog / resid[:, np.newaxis]
+            diff = np.max(np.abs(beta - beta0))
+            history["params"].append(beta)
+            history["mse"].append(np.mean(resid * resid))
+
+            if (n_iter >= 300) and (n_iter % 100 == 0):
+                # check for convergence circle, should not happen
+                for ii in range(2, 10):
+                    if np.all(beta == history["params"][-ii]):
+                        cycle = True
+                        warnings.warn("Convergence cycle detected",
+                                      ConvergenceWarning, stacklevel=2)
+                        break
+
+        if n_iter == max_iter:
+            warnings.warn(f"Maximum number of iterations ({max_iter}) reached.",
+                          IterationLimitWarning, stacklevel=2)
+
+        e = endog - np.dot(exog, beta)
+        iqre = stats.scoreatpercentile(e, 75) - stats.scoreatpercentile(e, 25)
+        h = bandwidth(nobs, q)
+        h = min(np.std(endog), iqre / 1.34) * (norm.ppf(q + h) - norm.ppf(q - h))
+
+        fhat0 = 1. / (nobs * h) * np.sum(kernel(e / h))
+
+        if vcov == "robust":
+            d = np.where(e > 0, (q / fhat0)**2, ((1 - q) / fhat0)**2)
+            xtxi = pinv(np.dot(exog.T, exog))
+            xtdx = np.dot(exog.T * d[np.newaxis, :], exog)
+            vcov = xtxi @ xtdx @ xtxi
+        elif vcov == "iid":
+            vcov = (1. / fhat0)**2 * q * (1 - q) * pinv(np.dot(exog.T, exog))
+        else:
+            raise ValueError("vcov must be 'robust' or 'iid'")
+
+        lfit = QuantRegResults(self, beta, normalized_cov_params=vcov)
+
+        lfit.q = q
+        lfit.iterations = n_iter
+        lfit.converged = diff <= p_tol
+        lfit.sparsity = 1. / fhat0
+        lfit.bandwidth = h
+        lfit.history = history
+
+        return RegressionResultsWrapper(lfit)
+
+    @staticmethod
+    def _irls_weights(resid: np.ndarray, q: float) -> np.ndarray:
+        """Absolute check-loss residuals used as IRLS weights."""
+
+        mask = np.abs(resid) < .000001
+        resid[mask] = ((resid[mask] >= 0) * 2 - 1) * .000001
+        resid = np.where(resid < 0, q * resid, (1 - q) * resid)
+        return np.abs(resid)
@@ -0,0 +1,113 @@
+"""Vectorised pinball loss of quantile forecasts."""
+
+import numpy as np
+import pandas as pd
+
+
+__all__: list[str] = ["pinball_loss", "pinball_scores"]
+
+
+def pinball_loss(
+    y: np.ndarray,
+    predictions: np.ndarray,
+    quantiles: list[int],
+    out: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Pinball loss of every prediction.
+
+    :param y: observations, shape (n,)
+    :param predictions: quantile predictions, shape (n, k)
+    :param quantiles: quantile levels in percent of the k columns
+    :param out: array of shape (n, k) the loss is written into
+    :return: loss per observation and quantile, shape (n, k)
+    :rtype: np.ndarray
+    """
+
+    alpha = np.asarray(quantiles, dtype=predictions.dtype) / 100
+    out = np.subtract(y[:, None], predictions, out=out)
+    # max(alpha * d, (alpha - 1) * d) == alpha * d - min(d, 0)
+    negative = np.minimum(out, 0)
+    np.multiply(out, alpha, out=out)
+    np.subtract(out, negative, out=out)
+    return out
+
+
+def pinball_scores(
+    y: np.ndarray,
+    predictions: np.ndarray,
+    quantiles: list[int],
+    groups: dict[str, np.ndarray] | None = None,
+    chunk_size: int = 100_000
+) -> dict[str, pd.DataFrame]:
+    """
+    Mean pinball loss per quantile and per group, e.g. per forecast horizon.
+
+    The loss is computed in chunks of ``chunk_size`` rows into one reused
+    buffer, so no full-size temporary arrays are created. float32 input
+    is scored in float32, the sums are accumulated in float64. Missing
+    observations or predictions are left out of the means.
+
+    :param y: observations, shape (n,)
+    :param predictions: quantile predictions, shape (n, k)
+    :param quantiles: quantile levels in percent of the k columns
+    :param groups: group labels of the rows by breakdown name, shape (n,)
+    :param chunk_size: number of rows scored at once
+    :return: "quantile" with the mean loss per quantile and one frame per
+        group with the mean loss per group value and quantile, the
+        mean over the quantiles ("score") and the number of rows ("count")
+    :rtype: dict[str, pd.DataFrame]
+    """
+
+    y = np.asarray(y)
+    predictions = np.asarray(predictions)
+    n, k = predictions.shape
+    columns = [f"q{q}" for q in quantiles]
+    dtype = np.result_type(y.dtype, predictions.dtype, np.float32)
+
+    codes = {}
+    for name, labels in (groups or {}).items():
+        group_codes, uniques = pd.factorize(np.asarray(labels), sort=True)
+        # rows without label go to an extra bucket that is dropped at the end
+        group_codes[group_codes < 0] = len(uniques)
+        codes[name] = (group_codes, uniques)
+
+    loss_sum = np.zeros(k)
+    loss_count = np.zeros(k)
+    group_sums = {name: np.zeros((len(u) + 1) * k) for name, (_, u) in codes.items()}
+    group_counts = {name: np.zeros((len(u) + 1) * k) for name, (_, u) in codes.items()}
+
+    buffer = np.empty((min(chunk_size, n), k), dtype=dtype)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        loss = pinball_loss(y[start:stop], predictions[start:stop], quantiles,
+                            out=buffer[:stop - start])
+        valid = ~np.isnan(loss)
+        loss[~valid] = 0
+        loss_sum += loss.sum(axis=0, dtype=np.float64)
+        loss_count += valid.sum(axis=0)
+
+        for name, (group_codes, _) in codes.items():
+            # one bincount over (group, quantile) cells instead of one per quantile
+            cells = (group_codes[start:stop, None] * k + np.arange(k)).ravel()
+            size = len(group_sums[name])
+            group_sums[name] += np.bincount(cells, weights=loss.ravel(),
+                                            minlength=size)
+            group_counts[name] += np.bincount(cells, weights=valid.ravel(),
+                                              minlength=size)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores = {
+            "quantile": pd.DataFrame({"pinball": loss_sum / loss_count,
+                                      "count": loss_count.astype(np.int64)},
+                                     index=pd.Index(columns, name="quantile"))
+        }
+        for name, (_, uniques) in codes.items():
+            sums = group_sums[name].reshape(-1, k)[:-1]
+            counts = group_counts[name].reshape(-1, k)[:-1]
+            frame = pd.DataFrame(sums / counts, index=pd.Index(uniques, name=name),
+                                 columns=columns)
+            frame["score"] = frame[columns].mean(axis=1)
+            frame["count"] = counts.max(axis=1).astype(np.int64)
+            scores[name] = frame
+    return scores
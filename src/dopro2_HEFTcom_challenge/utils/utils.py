@@ -1,39 +1,85 @@
 """Functions that are often used in the process."""
 
 from datetime import datetime
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Final, Literal
 
 from loguru import logger
+import numpy as np
 import pandas as pd
-import xarray as xr
 
-from statsmodels.base.model import Results
-from statsmodels.regression.quantile_regression import QuantRegResults
+# heavy dependencies are imported where they are used, so importing the
+# package (e.g. for the prediction stage) stays fast
+if TYPE_CHECKING:
+    from sklearn.preprocessing import OneHotEncoder
+    from statsmodels.base.model import Results
+    import xarray as xr
 
 
 __all__: list[str] = [
+    "CATEGORICAL_FEATURES",
+    "SEASON_LABELS",
+    "TIME_OF_DAY_LABELS",
+    "WIND_DIR_LABELS",
+    "add_calendar_features",
+    "align_nwp_models",
+    "apply_dtype_policy",
     "categorize_wind_dir",
+    "categorize_wind_dir_vectorized",
     "get_season",
+    "get_season_vectorized",
     "get_time_of_day",
+    "get_time_of_day_vectorized",
     "day_ahead_market_times",
+    "encode_categorical_features",
+    "fit_feature_encoder",
+    "load_feature_encoder",
     "load_models",
     "load_weather_data",
+    "merge_weather_data",
     "prep_submission_in_json_format",
-    "weather_df_to_xr"
+    "read_parquet_projected",
+    "read_partitioned_parquet",
+    "reduce_spatial",
+    "remove_partitioned_files",
+    "resample_interpolate",
+    "resample_interpolate_vectorized",
+    "weather_df_to_xr",
+    "write_partitioned_parquet"
 ]
 
+SEASON_LABELS: Final = ["autumn", "spring", "summer", "winter"]
+TIME_OF_DAY_LABELS: Final = ["afternoon", "morning", "night"]
+WIND_DIR_LABELS: Final = ["E", "N", "NE", "NW", "S", "SE", "SW", "W"]
+CATEGORICAL_FEATURES: Final = ["time_of_day", "season", "wind_dir_cat"]
 
-def load_models(path: Path) -> list[Results]:
+# codes into SEASON_LABELS, indexed by month (index 0 is unused)
+_SEASON_CODES: Final = np.array([-1, 3, 3, 1, 1, 1, 2, 2, 2, 0, 0, 0, 3], dtype=np.int8)
+# codes into TIME_OF_DAY_LABELS, indexed by hour
+_TIME_OF_DAY_CODES: Final = np.array([2] * 6 + [1] * 6 + [0] * 6 + [2] * 6,
+                                     dtype=np.int8)
+# bin edges of the wind directions and codes into WIND_DIR_LABELS per bin
+_WIND_DIR_BINS: Final = np.array([22.5, 67.5, 112.5, 157.5, 202.5, 247.5,
+                                  292.5, 337.5])
+_WIND_DIR_CODES: Final = np.array([1, 2, 0, 5, 4, 6, 7, 3, 1], dtype=np.int8)
+
+
+def load_models(path: Path) -> list["Results"]:
     """
     Load all quantile regression models (q10, ..., q90)
 
     :param path: Path to the model dictionary
-    :return: List with all models
+    :return: List with all models, ordered by quantile
     :rtype: list[Results]
     """
 
-    model_files = Path(path).glob("*.pickle")
+    from statsmodels.regression.quantile_regression import QuantRegResults
+
+    model_files = sorted(
+        Path(path).glob("model_q*.pickle"),
+        key=lambda file: int(file.stem.removeprefix("model_q"))
+    )
     models = []
     for file in model_files:
         models.append(QuantRegResults.load(file))
@@ -114,40 +160,32 @@ def prep_submission_in_json_format(submission_data: pd.DataFrame) -> dict:
     return data
 
 
-def weather_df_to_xr(weather_data: pd.DataFrame) -> xr.Dataset:
+def weather_df_to_xr(weather_data: pd.DataFrame) -> "xr.Dataset":
     """
     Turns rebase api weather dataframe into xarray Dataset.
 
+    Point data has one row per reference time, valid time and point.
+    Grid data has one row per reference time and valid time and one
+    column per variable and grid point, named
+    ``<variable>_latitude_<lat>_longitude_<lon>``.
+
     :param weather_data: weather data from api call
     :return: weather data as xarray Dataset
     :rtype: Dataset
     """
 
-    weather_data["ref_datetime"] = pd.to_datetime(weather_data["ref_datetime"],
-                                                  utc=True)
-    weather_data["valid_datetime"] = pd.to_datetime(weather_data["valid_datetime"],
-                                                    utc=True)
+    weather_data = weather_data.assign(
+        ref_datetime=pd.to_datetime(weather_data["ref_datetime"], utc=True),
+        valid_datetime=pd.to_datetime(weather_data["valid_datetime"], utc=True)
+    )
 
     if "point" in weather_data.columns:
         weather_data = weather_data.set_index(["ref_datetime",
                                                "valid_datetime",
                                                "point"])
+        weather_data = weather_data.to_xarray()  # type: ignore
     else:
-        weather_data = pd.melt(weather_data, id_vars=["ref_datetime", "valid_datetime"])
-
-        weather_data = (
-            pd.concat(
-                [weather_data, weather_data["variable"].str.split("_", expand=True)],
-                axis=1
-            )
-            .drop(["variable", 1, 3], axis=1)
-            .rename(columns={0: "variable", 2: "latitude", 4: "longitude"})
-            .set_index(["ref_datetime", "valid_datetime",
-                        "longitude", "latitude"])
-            .pivot(columns="variable", values="value")
-        )
-
-    weather_data = weather_data.to_xarray()  # type: ignore
+        weather_data = _grid_df_to_xr(weather_data)
 
     weather_data["ref_datetime"] = pd.DatetimeIndex(
         weather_data["ref_datetime"].values, tz="UTC"
@@ -159,58 +197,508 @@ def weather_df_to_xr(weather_data: pd.DataFrame) -> xr.Dataset:
     return weather_data  # type: ignore
 
 
+def _grid_df_to_xr(weather_data: pd.DataFrame) -> "xr.Dataset":
+    """
+    Reshape a wide grid response into a Dataset with the dimensions
+    (ref_datetime, valid_datetime, longitude, latitude) and one variable
+    per weather variable.
+
+    The column names are parsed once and the value block is scattered
+    into the full coordinate grid with NumPy. The coordinates are sorted
+    and the latitudes and longitudes stay strings, as if the data had
+    been melted, pivoted and converted with ``to_xarray``. Missing
+    combinations are NaN.
+    """
+
+    import xarray as xr
+
+    time_columns = ["ref_datetime", "valid_datetime"]
+    value_columns = [c for c in weather_data.columns if c not in time_columns]
+    parts = [column.split("_") for column in value_columns]
+    variable_codes, variables = pd.factorize(
+        np.array([p[0] for p in parts], dtype=object), sort=True
+    )
+    latitude_codes, latitudes = pd.factorize(
+        np.array([p[2] for p in parts], dtype=object), sort=True
+    )
+    longitude_codes, longitudes = pd.factorize(
+        np.array([p[4] for p in parts], dtype=object), sort=True
+    )
+    ref_codes, refs = pd.factorize(weather_data["ref_datetime"], sort=True)
+    valid_codes, valids = pd.factorize(weather_data["valid_datetime"], sort=True)
+
+    if weather_data.duplicated(time_columns).any():
+        raise ValueError("Index contains duplicate entries, cannot reshape")
+
+    values = weather_data[value_columns].to_numpy()
+    shape = (len(variables), len(refs), len(valids), len(longitudes), len(latitudes))
+    complete = (len(weather_data) == shape[1] * shape[2]
+                and len(value_columns) == shape[0] * shape[3] * shape[4])
+    dtype = values.dtype if complete else np.result_type(values.dtype, np.float64)
+    grid = np.full(shape, np.nan, dtype=dtype)
+    grid[variable_codes[None, :], ref_codes[:, None], valid_codes[:, None],
+         longitude_codes[None, :], latitude_codes[None, :]] = values
+
+    dims = ("ref_datetime", "valid_datetime", "longitude", "latitude")
+    return xr.Dataset(
+        {variable: (dims, grid[i]) for i, variable in enumerate(variables)},
+        coords={"ref_datetime": refs, "valid_datetime": valids,
+                "longitude": longitudes, "latitude": latitudes}
+    )
+
+
+def reduce_spatial(
+    dataset: "xr.Dataset",
+    dimension: list[str],
+    reducers: list[dict] | None = None
+) -> "xr.Dataset":
+    """
+    Reduce the spatial dimensions of weather data with configured reducers.
+
+    Every reducer is a dict with a ``type`` and optionally the
+    ``variables`` it is applied to and a ``name`` used as column suffix:
+
+    - ``mean``: mean over all cells, keeps the variable names
+    - ``weighted_mean``: mean with ``weights`` per cell (nested list in
+      the order of ``dimension``) or point, suffix ``wmean``
+    - ``quantile``: quantiles ``q`` (list of values in [0, 1]),
+      suffix ``q<percent>``
+    - ``min`` / ``max``: minimum or maximum, suffix ``min`` / ``max``
+    - ``nearest``: the cell nearest to ``latitude`` and ``longitude``
+      or the given ``point``, suffix ``nearest``
+
+    The reductions are lazy if the data is backed by dask, so only the
+    reduced variables are loaded.
+
+    :param dataset: weather data
+    :param dimension: spatial dimensions, latitude/longitude or point
+    :param reducers: reducers to apply, default is the mean
+    :return: reduced weather data without the spatial dimensions
+    :rtype: Dataset
+    """
+
+    import xarray as xr
+
+    reduced = []
+    for reducer in reducers or [{"type": "mean"}]:
+        kind = reducer["type"]
+        data = dataset[reducer["variables"]] if "variables" in reducer else dataset
+        suffix = reducer.get("name", kind)
+        if kind == "mean":
+            reduced.append(data.mean(dim=dimension))
+            continue
+        if kind == "weighted_mean":
+            weights = xr.DataArray(np.asarray(reducer["weights"], dtype=float),
+                                   dims=dimension)
+            result = data.weighted(weights).mean(dim=dimension)
+            suffix = reducer.get("name", "wmean")
+        elif kind in ("min", "max"):
+            result = getattr(data, kind)(dim=dimension)
+        elif kind == "quantile":
+            for q in reducer["q"]:
+                name = reducer.get("name", f"q{round(100 * q)}")
+                result = data.quantile(q, dim=dimension).drop_vars("quantile")
+                reduced.append(
+                    result.rename({v: f"{v}_{name}" for v in result.data_vars})
+                )
+            continue
+        elif kind == "nearest":
+            if "point" in reducer:
+                result = data.isel(point=reducer["point"])
+            else:
+                # grid coordinates of API data are strings
+                data = data.assign_coords(latitude=data["latitude"].astype(float),
+                                          longitude=data["longitude"].astype(float))
+                result = data.sel(latitude=reducer["latitude"],
+                                  longitude=reducer["longitude"], method="nearest")
+            result = result.drop_vars([d for d in dimension if d in result.coords])
+        else:
+            raise ValueError(f"Unknown spatial reducer {kind!r}")
+        reduced.append(result.rename({v: f"{v}_{suffix}" for v in result.data_vars}))
+
+    return xr.merge(reduced)
+
+
 def load_weather_data(
-    input: xr.Dataset | Path,
+    input: "xr.Dataset | Path",
     dtype: Literal["hornsea", "solar"],
     api: bool = False,
+    reducers: list[dict] | None = None
 ) -> pd.DataFrame:
     """
     Load xarray weather data, preprocess it and return an dataframe.
 
+    Files are opened lazily with dask, so only the spatially reduced
+    variables are loaded into memory. Without dask the files are read
+    eagerly.
+
     :param dataset: xarray dataset with weather data
     :param dtype: wind (hornsea) or solar data
     :param api: True, if data comes from api call, else from a dataset
+    :param reducers: spatial reducers, see ``reduce_spatial``
     :return: DataFrame with preprocessed data
     :rtype: DataFrame
     """
 
     if isinstance(input, Path):
-        dataset = xr.open_dataset(input)
+        import xarray as xr
+
+        # dask is a dependency, the check only keeps bare installs working
+        chunks = {} if find_spec("dask") is not None else None
+        dataset = xr.open_dataset(input, chunks=chunks)
     else:
         dataset = input
 
     dimension = ["latitude", "longitude"] if dtype == "hornsea" else ["point"]
     df = (
-        dataset
-        .mean(dim=dimension)
+        reduce_spatial(dataset, dimension, reducers)
         .to_dataframe()
         .reset_index()
     ).rename(columns={"ref_datetime": "reference_time", "valid_datetime": "valid_time"})
+    if isinstance(input, Path):
+        dataset.close()
     if api:
         df["hours_after"] = ((df["valid_time"] - df["reference_time"])
                              .dt.total_seconds() // 3600).astype(int)
-        df = (
-            df
-            .set_index("valid_time").groupby("reference_time")
-            .resample("30min").interpolate("linear")
-            .drop(columns="reference_time", axis=1)
-            .reset_index()
+        return resample_interpolate_vectorized(df)
+    df = df.assign(
+        reference_time=df["reference_time"].dt.tz_localize("UTC"),
+        hours_after=df["valid_time"],
+        valid_time=(
+            df["reference_time"] + pd.to_timedelta(df["valid_time"], unit="hours")
+        ).dt.tz_localize("UTC")
+    )
+
+    return resample_interpolate_vectorized(df)
+
+
+def resample_interpolate(df: pd.DataFrame, freq: str = "30min") -> pd.DataFrame:
+    """
+    Upsample the forecasts of every reference time to ``freq`` and
+    interpolate linearly.
+
+    :param df: data with the columns reference_time and valid_time
+    :param freq: frequency of the valid times
+    :return: upsampled data sorted by reference_time and valid_time
+    :rtype: DataFrame
+    """
+
+    return (
+        df
+        .set_index("valid_time").groupby("reference_time")
+        .resample(freq).interpolate("linear")
+        .drop(columns="reference_time", axis=1)
+        .reset_index()
+    )
+
+
+def resample_interpolate_vectorized(
+    df: pd.DataFrame,
+    freq: str = "30min"
+) -> pd.DataFrame:
+    """
+    Same as ``resample_interpolate``, but all reference times at once.
+
+    The rows of all reference times are scattered into one array that
+    holds the regular grid of every reference time after the other. Each
+    missing value is interpolated between the previous and the next valid
+    value with the formula of ``np.interp`` that pandas uses. Like the
+    groupby path, which interpolates the combined result, this array is
+    interpolated as a whole: missing values at the start or end of a
+    reference time are interpolated towards the neighbouring reference
+    time, leading missing values of the first one stay missing and
+    trailing ones of the last one get the last valid value. Data that
+    does not fit the grid (valid times between grid points, duplicated
+    valid times or non-numeric columns) is passed to
+    ``resample_interpolate``.
+
+    :param df: data with the columns reference_time and valid_time
+    :param freq: frequency of the valid times
+    :return: upsampled data sorted by reference_time and valid_time
+    :rtype: DataFrame
+    """
+
+    value_columns = [c for c in df.columns if c not in ("reference_time", "valid_time")]
+    step = pd.Timedelta(freq)
+    if (
+        df.empty
+        or df[["reference_time", "valid_time"]].isna().any(axis=None)
+        or not all(pd.api.types.is_numeric_dtype(df[c])
+                   and not pd.api.types.is_bool_dtype(df[c]) for c in value_columns)
+        or (df["valid_time"].dt.floor(freq) != df["valid_time"]).any()
+        or df.duplicated(["reference_time", "valid_time"]).any()
+    ):
+        return resample_interpolate(df, freq)
+
+    group_codes, references = pd.factorize(df["reference_time"], sort=True)
+    # valid times as nanoseconds (UTC for time zone aware data)
+    valid_time = pd.DatetimeIndex(df["valid_time"])
+    nanoseconds = valid_time.asi8
+    step_ns = step.value
+    first = np.full(len(references), np.iinfo(np.int64).max)
+    last = np.full(len(references), np.iinfo(np.int64).min)
+    np.minimum.at(first, group_codes, nanoseconds)
+    np.maximum.at(last, group_codes, nanoseconds)
+    lengths = (last - first) // step_ns + 1
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    n_rows = int(lengths.sum())
+
+    # position of every row in the grid of all reference times
+    positions = starts[group_codes] + (nanoseconds - first[group_codes]) // step_ns
+    row_groups = np.repeat(np.arange(len(lengths)), lengths)
+    grid_start = starts[row_groups]
+    index = np.arange(n_rows)
+
+    grid_time = pd.DatetimeIndex(first[row_groups] + (index - grid_start) * step_ns)
+    if valid_time.tz is not None:
+        grid_time = grid_time.tz_localize("UTC").tz_convert(valid_time.tz)
+    columns = {
+        "reference_time": references.take(row_groups),
+        "valid_time": grid_time
+    }
+    for column in value_columns:
+        values = np.full(n_rows, np.nan)
+        values[positions] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        previous = np.maximum.accumulate(np.where(valid, index, -1))
+        following = np.minimum.accumulate(np.where(valid, index, n_rows)[::-1])[::-1]
+        has_previous = previous >= 0
+        has_following = following < n_rows
+        between = ~valid & has_previous & has_following
+        trailing = ~valid & has_previous & ~has_following
+
+        p, f = previous[between], following[between]
+        slope = (values[f] - values[p]) / (f - p)
+        result = values.copy()
+        result[between] = slope * (index[between] - p) + values[p]
+        result[trailing] = values[previous[trailing]]
+
+        # integer columns become float only if the grid has new rows
+        dtype = df[column].dtype
+        keep_dtype = dtype.kind == "f" or n_rows == len(df)
+        columns[column] = result.astype(dtype) if keep_dtype else result
+
+    return pd.DataFrame(columns)
+
+
+def align_nwp_models(
+    primary: pd.DataFrame,
+    secondary: dict[str, pd.DataFrame],
+    max_run_age: str | None = None,
+    direction: Literal["backward", "nearest"] = "backward"
+) -> pd.DataFrame:
+    """
+    Align the forecasts of further NWP models to the rows of a primary model.
+
+    The models are matched on ``valid_time``. Because the runs of the
+    models have different cadences, every primary run gets the latest run
+    of a further model that is not newer than its own reference time and
+    covers the valid time. The columns of the further models are suffixed,
+    e.g. ``WindSpeed_gfs``.
+
+    :param primary: preprocessed forecasts of the primary model
+    :param secondary: preprocessed forecasts of further models by suffix
+    :param max_run_age: maximum time between the reference time of the
+        primary run and the run of a further model, None for no limit
+    :param direction: "nearest" also matches newer runs, e.g. if only the
+        latest run of every model is available
+    :return: rows of the primary model with the columns of all models
+    :rtype: DataFrame
+    """
+
+    if not secondary:
+        return primary
+
+    # merge_asof needs the rows sorted by reference time, a stable sort
+    # keeps the order of the valid times within a run
+    aligned = primary.sort_values("reference_time", kind="stable")
+    tolerance = None if max_run_age is None else pd.Timedelta(max_run_age)
+    for suffix, df in secondary.items():
+        df = df.sort_values("reference_time", kind="stable").rename(
+            columns={c: f"{c}{suffix}" for c in df.columns
+                     if c not in ("reference_time", "valid_time")}
         )
-        return df
-    df = (
-        df.assign(
-            reference_time=df["reference_time"].dt.tz_localize("UTC"),
-            hours_after=df["valid_time"],
-            valid_time=(
-                df["reference_time"] + pd.to_timedelta(df["valid_time"], unit="hours")
-            ).dt.tz_localize("UTC")
-        ).set_index("valid_time").groupby("reference_time")
-         .resample("30min").interpolate("linear")
-         .drop(columns="reference_time", axis=1)
-         .reset_index()
+        aligned = pd.merge_asof(aligned, df, on="reference_time", by="valid_time",
+                                direction=direction, tolerance=tolerance)
+    return aligned.reset_index(drop=True)
+
+
+def merge_weather_data(
+    hornsea: pd.DataFrame,
+    solar: pd.DataFrame,
+    suffixes: tuple[str, ...] = ("",)
+) -> pd.DataFrame:
+    """
+    Merge the Hornsea and solar forecasts and name the columns both have.
+
+    :param hornsea: preprocessed wind forecasts
+    :param solar: preprocessed solar forecasts
+    :param suffixes: suffixes of the NWP models in the data, "" for the
+        primary model
+    :return: merged forecasts with temp_hornsea and temp_solar
+    :rtype: DataFrame
+    """
+
+    columns = {}
+    for suffix in suffixes:
+        columns.update({f"Temperature{suffix}_x": f"temp_hornsea{suffix}",
+                        f"Temperature{suffix}_y": f"temp_solar{suffix}",
+                        f"hours_after{suffix}_x": f"hours_after{suffix}"})
+    return (
+        hornsea
+        .merge(solar, how="outer", on=["reference_time", "valid_time"])
+        .rename(columns=columns)
+        .drop(columns=[f"hours_after{suffix}_y" for suffix in suffixes])
+    )
+
+
+def apply_dtype_policy(df: pd.DataFrame, policy: dict) -> pd.DataFrame:
+    """
+    Downcast the columns of a DataFrame as configured in the dtype policy.
+    Every column gets its configured type whatever its values are, so the
+    files written from different parts of the data share one schema.
+
+    :param df: data to downcast
+    :param policy: dtype policy from config.yaml with the keys
+        float32_columns, int_columns and category_columns
+    :return: downcasted copy of the data
+    :rtype: DataFrame
+    :raises ValueError: if a column of int_columns has missing, fractional
+        or out of range values
+    """
+
+    dtypes: dict = {}
+    for column in policy.get("float32_columns", []):
+        if column in df.columns:
+            dtypes[column] = np.float32
+    for column, int_dtype in policy.get("int_columns", {}).items():
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy(dtype=np.float64)
+        info = np.iinfo(int_dtype)
+        if (np.isnan(values).any() or not np.array_equal(values, np.round(values))
+                or values.min(initial=0) < info.min
+                or values.max(initial=0) > info.max):
+            raise ValueError(f"Column {column} can not be cast to {int_dtype}, "
+                             "add it to float32_columns")
+        dtypes[column] = int_dtype
+    for column in policy.get("category_columns", []):
+        if column in df.columns:
+            dtypes[column] = "category"
+
+    return df.astype(dtypes)
+
+
+def write_partitioned_parquet(
+    df: pd.DataFrame,
+    path: Path,
+    basename: str,
+    time_column: str = "reference_time",
+    compression: str = "snappy"
+) -> None:
+    """
+    Write a DataFrame into a parquet dataset partitioned by reference date.
+    The files inside each partition are named after ``basename``, so the
+    rows of one source file can be rewritten without touching the others.
+
+    :param df: data to write
+    :param path: root directory of the parquet dataset
+    :param basename: prefix of the written files, e.g. the source file name
+    :param time_column: datetime column the partition date is taken from
+    :param compression: parquet compression codec
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(
+        df.assign(reference_date=df[time_column].dt.strftime("%Y-%m-%d")),
+        preserve_index=False
+    )
+    pq.write_to_dataset(
+        table,
+        root_path=path,
+        partition_cols=["reference_date"],
+        basename_template=f"{basename}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        compression=compression
     )
 
-    return df
+
+def remove_partitioned_files(path: Path, basename: str) -> None:
+    """
+    Remove all files of one source from a partitioned parquet dataset.
+
+    :param path: root directory of the parquet dataset
+    :param basename: prefix of the files, e.g. the source file name
+    """
+
+    for file in Path(path).glob(f"*/{basename}-*.parquet"):
+        file.unlink()
+
+
+def read_parquet_projected(
+    path: Path,
+    columns: list[str],
+    start: str | None = None,
+    end: str | None = None,
+    time_column: str = "reference_time"
+) -> pd.DataFrame:
+    """
+    Read only the given columns and the rows with ``start <= time_column < end``
+    from a parquet file or dataset. The filter is pushed down to pyarrow,
+    so row groups outside the time range are skipped.
+
+    :param path: parquet file or directory
+    :param columns: columns to read
+    :param start: first timestamp to read (None = no limit)
+    :param end: end of the time range, exclusive (None = no limit)
+    :param time_column: datetime column the time range refers to
+    :return: projected and filtered data
+    :rtype: DataFrame
+    """
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet")
+    time_type = dataset.schema.field(time_column).type if (start or end) else None
+
+    def to_scalar(value: str) -> "pa.Scalar":
+        timestamp = pd.Timestamp(value)
+        if time_type.tz is not None and timestamp.tz is None:
+            timestamp = timestamp.tz_localize("UTC")
+        return pa.scalar(timestamp, type=time_type)
+
+    row_filter = None
+    if start is not None:
+        row_filter = ds.field(time_column) >= to_scalar(start)
+    if end is not None:
+        end_filter = ds.field(time_column) < to_scalar(end)
+        row_filter = end_filter if row_filter is None else row_filter & end_filter
+
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    logger.info("Read {} rows and {} columns from {}",
+                table.num_rows, table.num_columns, path)
+    return table.to_pandas()
+
+
+def read_partitioned_parquet(path: Path, sort_by: list[str]) -> pd.DataFrame:
+    """
+    Read a dataset written by write_partitioned_parquet.
+
+    :param path: root directory of the parquet dataset
+    :param sort_by: columns to sort the rows by
+    :return: data without the partition column
+    :rtype: DataFrame
+    """
+
+    return (
+        pd.read_parquet(path)
+        .drop(columns="reference_date")
+        .sort_values(sort_by, kind="stable")
+        .reset_index(drop=True)
+    )
 
 
 def get_time_of_day(hour):
@@ -252,6 +740,132 @@ def categorize_wind_dir(degree):
         return "NW"
 
 
+def get_season_vectorized(month) -> pd.Categorical:
+    """
+    Vectorized version of get_season.
+
+    :param month: array with the months (1-12)
+    :return: season of every month
+    :rtype: Categorical
+    """
+
+    codes = _SEASON_CODES[np.asarray(month, dtype=np.int64)]
+    return pd.Categorical.from_codes(codes, categories=SEASON_LABELS)
+
+
+def get_time_of_day_vectorized(hour) -> pd.Categorical:
+    """
+    Vectorized version of get_time_of_day.
+
+    :param hour: array with the hours (0-23)
+    :return: time of day of every hour
+    :rtype: Categorical
+    """
+
+    codes = _TIME_OF_DAY_CODES[np.asarray(hour, dtype=np.int64)]
+    return pd.Categorical.from_codes(codes, categories=TIME_OF_DAY_LABELS)
+
+
+def categorize_wind_dir_vectorized(degree) -> pd.Categorical:
+    """
+    Vectorized version of categorize_wind_dir.
+    Like categorize_wind_dir, missing values are categorized as "NW".
+
+    :param degree: array with the wind directions in degree
+    :return: wind direction category of every value
+    :rtype: Categorical
+    """
+
+    degree = np.asarray(degree, dtype=np.float64)
+    codes = _WIND_DIR_CODES[np.digitize(degree, _WIND_DIR_BINS)]
+    codes[np.isnan(degree)] = WIND_DIR_LABELS.index("NW")
+    return pd.Categorical.from_codes(codes, categories=WIND_DIR_LABELS)
+
+
+def add_calendar_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add calendar columns and the categorical features derived from
+    valid_time and WindDirection:100.
+
+    :param df: weather data with valid_time and WindDirection:100
+    :return: data with year, month, day, hour and the categorical features
+    :rtype: DataFrame
+    """
+
+    valid_time = df["valid_time"].dt
+    return df.assign(
+        year=valid_time.year,
+        month=valid_time.month,
+        day=valid_time.day,
+        hour=valid_time.hour,
+        season=get_season_vectorized(valid_time.month),
+        time_of_day=get_time_of_day_vectorized(valid_time.hour),
+        wind_dir_cat=categorize_wind_dir_vectorized(df["WindDirection:100"])
+    )
+
+
+def fit_feature_encoder(df: pd.DataFrame, path: Path) -> "OneHotEncoder":
+    """
+    Fit one encoder for all categorical features and save it to disk.
+    The categories are fixed, so the dummy columns do not depend on the
+    categories that occur in the data.
+
+    :param df: data with the columns from CATEGORICAL_FEATURES
+    :param path: file in which the fitted encoder is stored
+    :return: fitted encoder
+    :rtype: OneHotEncoder
+    """
+
+    import joblib
+    from sklearn.preprocessing import OneHotEncoder
+
+    encoder = OneHotEncoder(
+        categories=[TIME_OF_DAY_LABELS, SEASON_LABELS, WIND_DIR_LABELS],
+        sparse_output=False,
+        dtype=np.uint8,
+        handle_unknown="ignore"
+    )
+    encoder.fit(df[CATEGORICAL_FEATURES])
+    joblib.dump(encoder, path)
+    logger.info("Saved feature encoder at {}", path)
+    return encoder
+
+
+def load_feature_encoder(path: Path) -> "OneHotEncoder":
+    """
+    Load the feature encoder saved by fit_feature_encoder.
+
+    :param path: file in which the fitted encoder is stored
+    :return: fitted encoder
+    :rtype: OneHotEncoder
+    """
+
+    import joblib
+
+    return joblib.load(path)
+
+
+def encode_categorical_features(
+    df: pd.DataFrame,
+    encoder: "OneHotEncoder"
+) -> pd.DataFrame:
+    """
+    Append the uint8 dummy columns of the categorical features.
+
+    :param df: data with the columns from CATEGORICAL_FEATURES
+    :param encoder: fitted encoder
+    :return: data with the dummy columns
+    :rtype: DataFrame
+    """
+
+    encoded = pd.DataFrame(
+        encoder.transform(df[CATEGORICAL_FEATURES]),
+        columns=encoder.get_feature_names_out(),
+        index=df.index
+    )
+    return pd.concat([df, encoded], axis=1)
+
+
 def remove_upperbound(merged_table_features, percentage=0.02):
     columns = ['SolarDownwardRadiation', 'temp_hornsea', 'temp_solar', 'WindSpeed', 'WindSpeed:100']
     n = round(len(merged_table_features) * percentage)
@@ -0,0 +1,97 @@
+"""Tests for the weather loading paths of DataPreparation."""
+
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from dopro2_HEFTcom_challenge.components import DataPreparation
+from dopro2_HEFTcom_challenge.entity import DataPreparationConfig
+
+
+def write_icon_files(directory: Path) -> None:
+    """Write two small ICON-EU files per site like the ones of the challenge."""
+
+    rng = np.random.default_rng(0)
+    directory.mkdir(parents=True)
+    for start in ("2023-01-01", "2023-01-03"):
+        ref_times = pd.date_range(start, periods=4, freq="12h")
+        lead_times = np.arange(0, 7)
+        stem = start.replace("-", "")
+        grid = {"ref_datetime": ref_times, "valid_datetime": lead_times,
+                "latitude": [53.77, 53.84], "longitude": [1.70, 1.77]}
+        shape = tuple(len(values) for values in grid.values())
+        xr.Dataset(
+            {name: (tuple(grid), rng.uniform(0, 20, shape))
+             for name in ("WindSpeed", "WindSpeed:100", "WindDirection",
+                          "WindDirection:100", "Temperature", "RelativeHumidity")},
+            coords=grid
+        ).to_netcdf(directory / f"dwd_icon_eu_hornsea_1_{stem}.nc")
+
+        points = {"ref_datetime": ref_times, "valid_datetime": lead_times,
+                  "point": np.arange(3)}
+        shape = tuple(len(values) for values in points.values())
+        xr.Dataset(
+            {name: (tuple(points), rng.uniform(0, 100, shape))
+             for name in ("SolarDownwardRadiation", "CloudCover", "Temperature")},
+            coords=points
+        ).to_netcdf(directory / f"dwd_icon_eu_pes10_{stem}.nc")
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> DataPreparationConfig:
+    write_icon_files(tmp_path / "weather")
+    return DataPreparationConfig(
+        root_dir=tmp_path / "prepared",
+        weather_data_path=tmp_path / "weather",
+        energy_data_path=tmp_path / "energy",
+        training_data_path=tmp_path / "prepared" / "train_data",
+        test_data_path=tmp_path / "prepared" / "test_data",
+        n_workers=1,
+        incremental=False,
+        manifest_path=tmp_path / "prepared" / "manifest.json",
+        feature_encoder_path=tmp_path / "prepared" / "feature_encoder.joblib",
+        dtype_policy={"float32_columns": ["WindSpeed", "Temperature", "CloudCover",
+                                          "SolarDownwardRadiation", "hours_after"],
+                      "compression": "zstd"},
+        checkpoints=["dwd_hornsea_processed", "dwd_solar_processed"],
+        async_checkpoints=False,
+        n_writers=1,
+        test_start="2023-01-03",
+        test_end="2023-01-05",
+        spatial_reducers={"hornsea": [{"type": "mean"}], "solar": [{"type": "mean"}]},
+        nwp_sources=[{"name": "dwd", "files": "dwd_icon_eu", "model": "DWD_ICON-EU",
+                      "suffix": ""}],
+        nwp_max_run_age=None,
+        model_data_path=tmp_path / "prepared" / "model_data.parquet",
+        model_data_max_hours_after=50
+    )
+
+
+@pytest.mark.parametrize("changes", [{"n_workers": 2}, {"incremental": True}],
+                         ids=["parallel", "incremental"])
+def test_weather_paths_return_the_serial_data(
+    config: DataPreparationConfig,
+    changes: dict
+) -> None:
+    Path(config.root_dir).mkdir()
+    serial = DataPreparation(config).cleaning_weather_data()
+    other = DataPreparation(replace(config, **changes)).cleaning_weather_data()
+
+    for expected, result in zip(serial, other):
+        pd.testing.assert_frame_equal(result.reset_index(drop=True),
+                                      expected.reset_index(drop=True))
+
+
+def test_serial_path_downcasts_only_the_checkpoint(
+    config: DataPreparationConfig
+) -> None:
+    Path(config.root_dir).mkdir()
+    hornsea, _ = DataPreparation(config).cleaning_weather_data()
+    checkpoint = pd.read_parquet(f"{config.root_dir}/dwd_hornsea_processed.parquet")
+
+    assert hornsea["WindSpeed"].dtype == np.float64
+    assert checkpoint["WindSpeed"].dtype == np.float32